@@ -26,6 +26,9 @@ if __name__=='__main__':
             print(json.dumps(setting, indent=2))
 
         setting_name = path.splitext(path.basename(json_path))[0]
+        cache_dir = setting['general_setup'].get('cache_dir')
+        if cache_dir is not None:
+            cache_dir = path.join(proj_root, cache_dir)
         
         NNW.eval_wrapper(setting_name=setting_name, 
                         proj_root=proj_root, 
@@ -36,5 +39,8 @@ if __name__=='__main__':
                         categ_vars=setting['general_setup']['categ_vars'], 
                         num_vars=setting['general_setup']['num_vars'],
                         bin_vars=setting['general_setup']['bin_vars'],
-                        nn_settings=setting['nn_setup'])
+                        nn_settings=setting['nn_setup'],
+                        cache_dir=cache_dir,
+                        transform_cache_size=setting['general_setup'].get('transform_cache_size'),
+                        max_uri_decode_depth=setting['general_setup'].get('max_uri_decode_depth'))
 
@@ -29,23 +29,41 @@ class BalancedData():
                 raise Exception(f"Did not find dataset '{dataset}' in specified collections.\nAvailable keys: {list(file_collections.keys())}")
 
     
-    def load_data(self, common_path_prefix = path.join('data', "raw")):
+    def load_data(self, common_path_prefix = path.join('data', "raw"), stream=False, n_workers=1, cache=None, compact=False):
+        """Loads and merges all files of the dataset.
+
+        Args:
+            common_path_prefix (str, optional): path to the files (from `proj_root`). Defaults to 'data/raw'.
+            stream (bool, optional): Parse the files incrementally instead of loading each one
+                as a whole. Defaults to False.
+            n_workers (int, optional): Number of worker processes loading and structuring
+                the files concurrently. Defaults to 1.
+            cache (DataCache, optional): Cache for the merged dataframe. If it already holds the
+                dataframe for these files, nothing is loaded. Defaults to None.
+            compact (bool, optional): Hold the requests as compact `RequestRecord`s. Defaults to False.
+        """
         #path_to_data= path.join(self.proj_root, 'data')
         self.loaders = []
         for file in self.files:
             self.loaders.append(
-                DataLoaderJSON(path.join(common_path_prefix, file), self.proj_root)
+                DataLoaderJSON(path.join(common_path_prefix, file), self.proj_root, stream=stream, compact=compact)
             )
 
-        self.multi_loader = MultiLoaderJSON(self.loaders)
+        self.multi_loader = MultiLoaderJSON(self.loaders, n_workers=n_workers)
+        self.cache = cache
+        if cache is not None and cache.key(self.multi_loader.cache_sources(), DataLoaderJSON.structured_version("multi")) in cache:
+            print(">> Found merged data in cache, skipping loading.")
+            return
         self.multi_loader.load_wrapper()
-        print(">> Loaded data. Now merging..")
-        self.multi_loader.merge_loaded_data()
-        print(">> Merging done.")
+        print(">> Loaded data.")
 
 
     def get_all_data(self):
+        if not hasattr(self.multi_loader, 'all_data'):
+            print(">> Merging data..")
+            self.multi_loader.merge_loaded_data()
+            print(">> Merging done.")
         return self.multi_loader.all_data
 
     def get_all_data_df(self):
-        return self.multi_loader.data_to_dataframe()
+        return self.multi_loader.data_to_dataframe(cache=self.cache)
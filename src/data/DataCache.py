@@ -0,0 +1,162 @@
+import hashlib
+import json
+import os
+from os import path
+import time
+
+import pandas as pd
+
+
+class DataCache():
+    """Content-addressed on-disk cache for structured dataframes.
+
+    Dataframes are stored in the columnar Feather (Arrow IPC) format. The key of an entry
+    combines the content hashes of the raw files it was built from with a version string
+    of the transformation code, so changing either invalidates the entry automatically.
+    The total size of the cache is capped; least recently used entries are evicted first.
+    """
+
+    INDEX_FILE = "index.json"
+
+    def __init__(self, cache_dir, max_bytes=2 * 1024**3):
+        """Constructor.
+
+        Args:
+            cache_dir (str): directory to store the cache in (created if missing)
+            max_bytes (int, optional): maximum total size of all cached dataframes. Defaults to 2 GiB.
+        """
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        os.makedirs(cache_dir, exist_ok=True)
+        self.index_path = path.join(cache_dir, self.INDEX_FILE)
+        self._read_index()
+        self._evict()
+        self._write_index()
+
+    def _read_index(self):
+        try:
+            with open(self.index_path, "r") as f:
+                self.index = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            self.index = {}
+        self.index.setdefault('files', {})
+        self.index.setdefault('entries', {})
+
+    def _write_index(self):
+        tmp_path = self.index_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.index, f, indent=2)
+        os.replace(tmp_path, self.index_path)
+
+    def _entry_path(self, key):
+        return path.join(self.cache_dir, key + ".feather")
+
+    def file_hash(self, file_path):
+        """Computes the SHA-256 hash of a file's content. Hashes are remembered in the index
+        as long as size and modification time of the file do not change.
+
+        Args:
+            file_path (str): path to the file
+
+        Returns:
+            str: hex digest
+        """
+        file_path = path.abspath(file_path)
+        stat = os.stat(file_path)
+        known = self.index['files'].get(file_path)
+        if known is not None and known['size'] == stat.st_size and known['mtime'] == stat.st_mtime_ns:
+            return known['sha256']
+
+        sha = hashlib.sha256()
+        with open(file_path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                sha.update(block)
+        digest = sha.hexdigest()
+        self.index['files'][file_path] = {'size': stat.st_size, 'mtime': stat.st_mtime_ns, 'sha256': digest}
+        self._write_index()
+        return digest
+
+    def key(self, file_paths, version):
+        """Builds the cache key for a dataframe created from the given raw files.
+
+        Args:
+            file_paths (list of str): raw files (order matters)
+            version (str): version of the code transforming the raw files
+
+        Returns:
+            str: cache key
+        """
+        sha = hashlib.sha256(str(version).encode())
+        for file_path in file_paths:
+            sha.update(self.file_hash(file_path).encode())
+        return sha.hexdigest()
+
+    def __contains__(self, key):
+        return key in self.index['entries'] and path.exists(self._entry_path(key))
+
+    def load(self, key):
+        """Loads a cached dataframe.
+
+        Args:
+            key (str): cache key
+
+        Returns:
+            pd.DataFrame: cached dataframe or `None` if there is no such entry
+        """
+        if key not in self:
+            return None
+        df = pd.read_feather(self._entry_path(key))
+        self.index['entries'][key]['last_access'] = time.time()
+        self._write_index()
+        return df
+
+    def store(self, key, df, file_paths):
+        """Stores a dataframe. Older entries built from the same raw files are stale (their
+        content or the transformation changed) and are removed. Afterwards, least recently
+        used entries are evicted until the cache fits into `max_bytes`.
+
+        Args:
+            key (str): cache key
+            df (pd.DataFrame): dataframe to store
+            file_paths (list of str): raw files the dataframe was built from
+        """
+        sources = [path.abspath(p) for p in file_paths]
+        for other_key, entry in list(self.index['entries'].items()):
+            if other_key != key and entry['sources'] == sources:
+                self._remove(other_key)
+
+        tmp_path = self._entry_path(key) + ".tmp"
+        df.reset_index(drop=True).to_feather(tmp_path)
+        os.replace(tmp_path, self._entry_path(key))
+        self.index['entries'][key] = {
+            'sources': sources,
+            'size': path.getsize(self._entry_path(key)),
+            'last_access': time.time()
+        }
+        self._evict(keep=key)
+        self._write_index()
+
+    def _remove(self, key):
+        self.index['entries'].pop(key, None)
+        try:
+            os.remove(self._entry_path(key))
+        except FileNotFoundError:
+            pass
+
+    def _evict(self, keep=None):
+        entries = sorted(self.index['entries'].items(), key=lambda e: e[1]['last_access'])
+        total = sum(entry['size'] for _, entry in entries)
+        for key, entry in entries:
+            if total <= self.max_bytes:
+                break
+            if key == keep:
+                continue
+            self._remove(key)
+            total -= entry['size']
+
+    def clear(self):
+        """Removes all cached dataframes.
+        """
+        for key in list(self.index['entries']):
+            self._remove(key)
+        self._write_index()
@@ -19,13 +19,12 @@ class DataFaker(object):
         if not self.data_loader.data_loaded:
             self.data_loader.load_wrapper()
 
-        # 2. Transform & save requests
+        # 2. Transform & save requests (written incrementally, one request at a time)
         for key in self.data_loader.requests:
-            our_format = self.requests_to_our_format(self.data_loader.requests[key])
             file_name = path.splitext(path.basename(self.data_loader.file_names[key]))[0] + ".json"
             file_path = path.join(self.path, file_name)
             with open(file_path, "w") as f:
-                f.write(our_format)
+                write_records(self.iter_our_format(self.data_loader.requests[key]), f)
             print(f"DataFaker: Writing to {file_path}")
 
     def requests_to_our_format(self, requests, indents = None):
@@ -38,7 +37,17 @@ class DataFaker(object):
         Returns:
             str: json string
         """
-        objs = []
+        return json.dumps(list(self.iter_our_format(requests)), indent=indents)
+
+    def iter_our_format(self, requests):
+        """Generator version of `requests_to_our_format`: transforms the request objects one at a time.
+
+        Args:
+            requests ([Request]): List of HTTPRequest objects
+
+        Yields:
+            dict: request in our format
+        """
         for id, request in enumerate(requests):
             obj = {}
             # id         
@@ -77,7 +86,36 @@ class DataFaker(object):
                     "Pragma": "no-cache"
                 }
             }
-            objs.append(obj)
-        
-        return json.dumps(objs, indent=indents)
+            yield obj
+
+
+def write_records(records, f, json_lines=False, indent=None):
+    """Writes requests in our format incrementally, so that they never have to be held in
+    memory (or serialized) as a whole.
+
+    Args:
+        records (iterable of dict): requests in our format
+        f (file): text file object opened for writing
+        json_lines (bool, optional): write one request per line (JSON Lines) instead of a JSON array. Defaults to False.
+        indent (int, optional): number of indent spaces for JSON arrays. Defaults to None.
+
+    Returns:
+        int: number of written requests
+    """
+    n = 0
+    if json_lines:
+        for record in records:
+            f.write(json.dumps(record))
+            f.write("\n")
+            n += 1
+        return n
+
+    f.write("[")
+    for record in records:
+        if n > 0:
+            f.write(", ")
+        f.write(json.dumps(record, indent=indent))
+        n += 1
+    f.write("]")
+    return n
 
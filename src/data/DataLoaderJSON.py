@@ -1,79 +1,183 @@
 from os import path
 import json
 import pandas as pd
-import numpy as np
 
 from src.data.DataLoader import DataLoader
 from src.data.HTTPRequest import HTTPRequest
+from src.data.RequestRecord import to_request_records
+from src.data.StructuredFrameBuilder import StructuredFrameBuilder
 from src.transformation.HTTPTransformer import HTTPTransformer
-from src.transformation.ZAPIDTransformer import ZAPIDTransformer
-from src.transformation.HTTPHeaders import transform_header_dict, HTTP_RELEVANT_HEADERS
+from src.transformation.ZAPIDTransformer import get_zap_lookup
+from src.transformation.HTTPHeaders import get_header_encoder, HTTP_RELEVANT_HEADERS
+from src.utils.json_stream import is_json_lines, iter_json_lines, iter_json_records
 
 class DataLoaderJSON(DataLoader):
 
-    def __init__(self, file_path, proj_root):
+    # Version of the structured output. Increase it whenever the transformation of the
+    # requests changes, so that cached dataframes (see `DataCache`) are invalidated.
+    STRUCTURED_VERSION = "3"
+
+    @classmethod
+    def structured_version(cls, kind="single"):
+        """Version of the structured output including the settings of the transformation
+        and the kind of frame (used in cache keys).
+
+        Args:
+            kind (str, optional): kind of frame, `single` for the frame of a single file
+                (`data_to_structured_df`) or `multi` for merged frames with the origin columns
+                (`MultiLoaderJSON.data_to_dataframe`). Defaults to "single".
+
+        Returns:
+            str: version
+        """
+        return f"{cls.STRUCTURED_VERSION}-depth{HTTPTransformer.max_uri_decode_depth}:{kind}"
+
+    def __init__(self, file_path, proj_root, stream=False, compact=False):
         """Constructor.
 
         Args:
             file_path (str): path from !project root!
+            stream (bool, optional): If True, the file is never loaded as a whole but parsed
+                incrementally whenever the data is iterated. Defaults to False.
+            compact (bool, optional): If True, requests are held as compact `RequestRecord`s
+                (slotted, interned strings, shared headers) instead of nested dicts. Defaults to False.
         """
         self.proj_root = proj_root
         self.path = path.join(proj_root, file_path)
+        self.stream = stream
+        self.compact = compact
         self.data_loaded = False
 
     def load_wrapper(self):
-        """Wraps the loading steps.
+        """Wraps the loading steps. In streaming mode, nothing is read up front.
         """
-        self.extract_data()
+        if not self.stream:
+            self.extract_data()
         self.data_loaded = True
 
     def extract_data(self):
         """Extract the data from the specified file & converts it into a python object.
+        Files in JSON Lines format (one request per line) are detected automatically.
+        In compact mode, the requests are parsed one at a time and converted into records.
         """
+        if self.compact:
+            self.data_dict = list(to_request_records(iter_json_records(self.path)))
+            return
         with open(self.path) as f:
+            if is_json_lines(f):
+                self.data_dict = list(iter_json_lines(f))
+                return
             file_string = f.read()
         self.data_dict = json.loads(file_string)
 
+    def iter_data(self):
+        """Yields the request objects one at a time. In streaming mode, the file is parsed
+        incrementally, so memory stays bounded by the size of a single request.
+
+        Yields:
+            dict: request object
+        """
+        if self.stream and self.compact:
+            yield from to_request_records(iter_json_records(self.path))
+        elif self.stream:
+            yield from iter_json_records(self.path)
+        else:
+            yield from self.data_dict
+
     def data_to_dataframe(self):
         """Transforms the data dict into a pandas dataframe. 
 
         Returns:
             pd.DataFrame: data
         """
+        if self.compact:
+            return pd.json_normalize([x.to_dict() for x in self.iter_data()])
+        if self.stream:
+            return pd.json_normalize(list(self.iter_data()))
         return pd.json_normalize(self.data_dict)
 
     def data_to_structured_dict_list(self):
-        zapper = ZAPIDTransformer(self.proj_root)
-        reqs = []
-        for x in self.data_dict:
-            request = x['request']
-            
-            uri_obj = HTTPTransformer.uri_transformation_wrapper(request['uri'])
-            r = {
-                "label": zapper.id_to_rule(x['header']['X-ZAP-Scan-ID']) if 'X-ZAP-Scan-ID' in x['header'] else "no zap id",
-                "original-zap-id": x['header']['X-ZAP-Scan-ID'] if 'X-ZAP-Scan-ID' in x['header'] else "no zap id",
-                "method": request['method'],
-                "uri-path": uri_obj['path'],
-                "uri-query": uri_obj['query'],
-                "body": "" if request['body'] == "" else HTTPTransformer.handle_body(request['body']),
-                "request-length": x['header']["Content-Length"] if "Content-Length" in x['header'] else -1,
-                "uri-length": len(request['uri']),
-                "body-length": len(request['body'])
-            }
-
-            header_dict = transform_header_dict(x['header'], headers=HTTP_RELEVANT_HEADERS)
-            r = {**r, **header_dict}
-
-            reqs.append(r)
-
-        return reqs
+        return list(self.iter_structured_dicts())
+
+    def iter_structured_dicts(self):
+        """Generator version of `data_to_structured_dict_list`.
+
+        Yields:
+            dict: structured request
+        """
+        zapper = get_zap_lookup(self.proj_root)
+        header_encoder = get_header_encoder(HTTP_RELEVANT_HEADERS, case_sensitive=True)
+        for x in self.iter_data():
+            yield self.request_to_structured_dict(x, zapper, header_encoder)
+
+    @staticmethod
+    def request_to_structured_dict(x, zapper, header_encoder=None):
+        """Transforms a single request object into a flat dict of features.
+
+        Args:
+            x (dict): request object
+            zapper (ZAPIDTransformer): lookup for the ZAP ids
+            header_encoder (HeaderEncoder, optional): encoder of the header presence (case-sensitive
+                `HTTP_RELEVANT_HEADERS`), pass it when transforming many requests. Defaults to None
+                (looked up per call).
+
+        Returns:
+            dict: structured request
+        """
+        request = x['request']
+
+        uri_obj = HTTPTransformer.uri_transformation_wrapper(request['uri'])
+        r = {
+            "label": zapper.id_to_rule(x['header']['X-ZAP-Scan-ID']) if 'X-ZAP-Scan-ID' in x['header'] else "no zap id",
+            "original-zap-id": x['header']['X-ZAP-Scan-ID'] if 'X-ZAP-Scan-ID' in x['header'] else "no zap id",
+            "method": request['method'],
+            "uri-path": uri_obj['path'],
+            "uri-query": uri_obj['query'],
+            "body": "" if request['body'] == "" else HTTPTransformer.handle_body(request['body']),
+            "request-length": x['header']["Content-Length"] if "Content-Length" in x['header'] else -1,
+            "uri-length": len(request['uri']),
+            "body-length": len(request['body']),
+            "uri-decode-depth": uri_obj['decode-depth']
+        }
+
+        if header_encoder is None:
+            header_encoder = get_header_encoder(HTTP_RELEVANT_HEADERS, case_sensitive=True)
+        header_dict = header_encoder.encode(x['header'])
+        return {**r, **header_dict}
     
-    def data_to_structured_df(self):
-        reqs = self.data_to_structured_dict_list()
-        df = pd.DataFrame(reqs)
+    def data_to_structured_df(self, cache=None, n_workers=1):
+        """Transforms the requests into a dataframe of features. Distinct URIs and bodies are
+        transformed in one batch.
 
-        df['request-length'] = df['request-length'].astype(np.float32)
-        df['label'] = df['label'].astype('str')
+        Args:
+            cache (DataCache, optional): If given, the dataframe is loaded from / stored in this cache. Defaults to None.
+            n_workers (int, optional): Number of worker processes for the batch transformation. Defaults to 1.
 
+        Returns:
+            pd.DataFrame: structured data
+        """
+        if cache is not None:
+            key = cache.key(self.cache_sources(), self.structured_version())
+            df = cache.load(key)
+            if df is not None:
+                print(f">> Loaded structured data of {self.path} from cache")
+                return df
+
+        if not self.data_loaded:
+            self.load_wrapper()
+        builder = StructuredFrameBuilder(self.proj_root, n_workers=n_workers)
+        builder.extend(self.iter_data())
+        df = builder.to_dataframe()
+
+        if cache is not None:
+            cache.store(key, df, self.cache_sources())
         return df
+
+    def cache_sources(self):
+        """Lists the files the structured data depends on (used as cache key).
+
+        Returns:
+            list of str: file paths
+        """
+        return [self.path, path.join(self.proj_root, "references", "ZAP_ids.csv")]
         
@@ -1,10 +1,13 @@
 from abc import ABC, abstractmethod
+from concurrent.futures import ProcessPoolExecutor
 from glob import glob
 from os import path
-import pandas as pd
-import numpy as np
+import time
 
 from src.data.DataLoader import DataLoader
+from src.data.DataLoaderJSON import DataLoaderJSON
+from src.data.StructuredFrameBuilder import StructuredFrameBuilder, concat_structured_frames
+from src.transformation.HTTPTransformer import HTTPTransformer
 
 class MultiDataLoader(ABC):
 
@@ -30,31 +33,199 @@ class MultiDataLoader(ABC):
 
 
 class MultiLoaderJSON(MultiDataLoader):
+
+    def __init__(self, data_loaders, n_workers=1):
+        """Constructor.
+
+        Args:
+            data_loaders (list): List of data loaders to handle.
+            n_workers (int, optional): Number of worker processes parsing and structuring the
+                files concurrently. With 1, everything runs in the current process. Defaults to 1.
+        """
+        super().__init__(data_loaders)
+        self.n_workers = n_workers
+        self.timings = {}
+
+    def load_wrapper(self):
+        """Executes the `load_wrapper()`s of all given data loaders. With multiple workers,
+        loading is deferred to the worker processes started by `merge_loaded_data()`.
+        """
+        if self.n_workers > 1:
+            print(f"Loading data deferred to {self.n_workers} worker processes...")
+            return
+        super().load_wrapper()
+
     def merge_loaded_data(self):
-        """Merges the datasets loaded by the single data loaders.
+        """Merges the datasets loaded by the single data loaders. With multiple workers, the
+        files are parsed and structured concurrently; the merged order always follows
+        the order of `data_loaders`. Per-file timings are stored in `timings`.
         """
         self.all_data = []
-        for loader in self.data_loaders:
-            structured_data = loader.data_to_structured_dict_list()
-            # Add origin to each request
-            origin = path.basename(loader.path)
-            for i, x in enumerate(structured_data):
-                structured_data[i]["data_origin"] = origin
-                structured_data[i]['data_tool'] = path.splitext(origin)[0].split("_")[-1].lower()
+        self.timings = {}
+        if self.n_workers > 1:
+            n_workers = min(self.n_workers, len(self.data_loaders))
+            with self.worker_pool(n_workers) as executor:
+                results = list(executor.map(load_and_structure, self.data_loaders))
+        else:
+            results = [load_and_structure(loader) for loader in self.data_loaders]
+
+        for loader, (structured_data, timing) in zip(self.data_loaders, results):
+            self.report_timing(loader, len(structured_data), timing)
             self.all_data.extend(structured_data)
+
+    @staticmethod
+    def worker_pool(n_workers):
+        """Creates the pool of worker processes. The settings of the transformations (URI decode
+        depth, memoisation) are passed on explicitly, as workers only inherit them when forked.
+
+        Args:
+            n_workers (int): number of worker processes
+
+        Returns:
+            ProcessPoolExecutor: pool
+        """
+        return ProcessPoolExecutor(max_workers=n_workers, initializer=HTTPTransformer.apply_transformation_settings,
+                                   initargs=(HTTPTransformer.transformation_settings(),))
+
+    def report_timing(self, loader, n_requests, timing):
+        """Stores and prints the timings of a single file.
+
+        Args:
+            loader (DataLoaderJSON): data loader of the file
+            n_requests (int): number of structured requests
+            timing (dict): timings of the `load` and `structure` steps in seconds
+        """
+        self.timings[loader.path] = timing
+        print(f">> {path.basename(loader.path)}: {n_requests} requests, "
+              f"loaded in {timing['load']:.2f}s, structured in {timing['structure']:.2f}s")
+
+    def iter_merged_data(self):
+        """Generator version of `merge_loaded_data`: yields the structured requests of all
+        data loaders one after another. Combined with streaming data loaders, no raw
+        dataset is ever held in memory as a whole.
+
+        Yields:
+            dict: structured request (including its origin)
+        """
+        for loader in self.data_loaders:
+            yield from iter_with_origin(loader)
             
-    def data_to_dataframe(self):
-        """Converts the loaded data into a pandas dataframe.
+    def data_to_dataframe(self, cache=None):
+        """Converts the loaded data into a pandas dataframe. If a cache is given and holds the
+        dataframe for the current files, loading and merging are skipped entirely.
+
+        Args:
+            cache (DataCache, optional): cache to load the dataframe from / store it in. Defaults to None.
 
         Returns:
             pd.DataFrame: merged loaded data
         """
-        df = pd.json_normalize(self.all_data)
-        df['request-length'] = df['request-length'].astype(np.float32)
-        df['label'] = df['label'].astype('str')
+        if cache is not None:
+            sources = self.cache_sources()
+            key = cache.key(sources, DataLoaderJSON.structured_version("multi"))
+            df = cache.load(key)
+            if df is not None:
+                print(">> Loaded merged data from cache")
+                return df
+
+        self.timings = {}
+        if self.n_workers > 1:
+            n_workers = min(self.n_workers, len(self.data_loaders))
+            with self.worker_pool(n_workers) as executor:
+                results = list(executor.map(load_and_build_frame, self.data_loaders))
+        else:
+            results = [load_and_build_frame(loader) for loader in self.data_loaders]
+
+        for loader, (frame, timing) in zip(self.data_loaders, results):
+            self.report_timing(loader, len(frame), timing)
+        df = concat_structured_frames([frame for frame, _ in results])
+
+        if cache is not None:
+            cache.store(key, df, sources)
         return df
+
+    def cache_sources(self):
+        """Lists the files the merged data depends on (used as cache key).
+
+        Returns:
+            list of str: file paths
+        """
+        sources = []
+        for loader in self.data_loaders:
+            sources.extend(loader.cache_sources())
+        return sources
             
 
+def get_origin(loader):
+    """Determines origin (file name) and tool (suffix of the file name, e.g., `zap`) of a data loader's data.
+
+    Args:
+        loader (DataLoaderJSON): data loader
+
+    Returns:
+        tuple: (origin, tool)
+    """
+    origin = path.basename(loader.path)
+    return origin, path.splitext(origin)[0].split("_")[-1].lower()
+
+
+def iter_with_origin(loader):
+    """Yields the structured requests of a single data loader with their origin added.
+
+    Args:
+        loader (DataLoaderJSON): data loader
+
+    Yields:
+        dict: structured request
+    """
+    origin, tool = get_origin(loader)
+    for x in loader.iter_structured_dicts():
+        x["data_origin"] = origin
+        x['data_tool'] = tool
+        yield x
+
+
+def load_and_structure(loader):
+    """Loads (if needed) and structures the data of a single data loader. Defined on module
+    level, so it can be executed in worker processes.
+
+    Args:
+        loader (DataLoaderJSON): data loader
+
+    Returns:
+        tuple: (list of structured requests, dict with the timings of the `load` and `structure` steps in seconds)
+    """
+    start = time.time()
+    if not loader.data_loaded:
+        loader.load_wrapper()
+    loaded = time.time()
+    structured_data = list(iter_with_origin(loader))
+    done = time.time()
+    return structured_data, {'load': loaded - start, 'structure': done - loaded}
+
+
+def load_and_build_frame(loader):
+    """Loads (if needed) the data of a single data loader and builds its structured dataframe
+    (including the origin columns). Defined on module level, so it can be executed in worker processes.
+
+    Args:
+        loader (DataLoaderJSON): data loader
+
+    Returns:
+        tuple: (structured pd.DataFrame, dict with the timings of the `load` and `structure` steps in seconds)
+    """
+    start = time.time()
+    if not loader.data_loaded:
+        loader.load_wrapper()
+    loaded = time.time()
+    origin, tool = get_origin(loader)
+    builder = StructuredFrameBuilder(loader.proj_root, with_origin=True)
+    builder.extend(loader.iter_data(), origin, tool)
+    frame = builder.to_dataframe()
+    done = time.time()
+    return frame, {'load': loaded - start, 'structure': done - loaded}
+
+
 def get_files_in_dir(path_to_dir, file_extension, proj_root=""):
     """Helper function: Lists all files with file extension `file_ext` in `path_to_dir` (from `proj_root`).
 
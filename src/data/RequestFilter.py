@@ -0,0 +1,127 @@
+from collections.abc import Mapping
+import re
+
+import numpy as np
+import pandas as pd
+
+
+class RequestFilter():
+    """Declarative filter for honeypot requests, evaluated on batches of requests.
+
+    A filter specification maps field paths to conditions; all conditions have to hold.
+    Field paths address (nested) request keys separated by `.`, e.g. `honeypot.used-emulator`
+    or `request.uri`, plus the derived fields `zap-id`, `type` and `corpus`. Supported
+    conditions:
+    - `{"eq": value}` / `{"ne": value}`: (in)equality
+    - `{"in": [values]}` / `{"not_in": [values]}`: membership
+    - `{"range": [min, max]}`: inclusive numeric range, `null` for an open end (e.g. `timestamp`, `id`)
+    - `{"regex": pattern}`: regular expression search (e.g. on `request.uri`)
+
+    Example:
+    ```
+    {"honeypot.used-emulator": {"in": ["rfi", "lfi"]}, "request.uri": {"regex": "\\.php"}}
+    ```
+    """
+
+    OPERATORS = ['eq', 'ne', 'in', 'not_in', 'range', 'regex']
+
+    def __init__(self, spec):
+        """Constructor. Validates the specification and compiles the regular expressions.
+
+        Args:
+            spec (dict): filter specification
+
+        Raises:
+            ValueError: if the specification is invalid
+        """
+        if not isinstance(spec, dict):
+            raise ValueError(f"Filter specification must be an object, got {type(spec).__name__}.")
+        self.conditions = []
+        for field, condition in spec.items():
+            if not isinstance(condition, dict) or len(condition) == 0:
+                raise ValueError(f"Condition for field '{field}' must be an object like {{\"eq\": value}}.")
+            for op, value in condition.items():
+                if op not in self.OPERATORS:
+                    raise ValueError(f"Unknown filter operator '{op}' for field '{field}'. Available: {self.OPERATORS}")
+                if op == 'regex':
+                    value = re.compile(value)
+                elif op == 'range':
+                    if not isinstance(value, list) or len(value) != 2:
+                        raise ValueError(f"Range for field '{field}' must be a list [min, max].")
+                elif op in ['in', 'not_in']:
+                    value = list(value)
+                self.conditions.append((field, field.split('.'), op, value))
+
+    @property
+    def fields(self):
+        """The fields referenced by the filter.
+
+        Returns:
+            list of str: field paths
+        """
+        return sorted({field for field, _, _, _ in self.conditions})
+
+    @staticmethod
+    def _lookup(request, keys):
+        value = request
+        for key in keys:
+            if not isinstance(value, Mapping) or key not in value:
+                return None
+            value = value[key]
+        return value
+
+    def _column(self, batch, field, keys, id_offset, connection_id_offset, constants):
+        if field in constants:
+            return pd.Series([constants[field]] * len(batch), dtype=object)
+        if field == 'zap-id':
+            return pd.Series([str(r['header']['X-ZAP-Scan-ID']) if 'X-ZAP-Scan-ID' in r['header'] else '-1' for r in batch], dtype=object)
+
+        column = pd.Series([self._lookup(r, keys) for r in batch], dtype=object)
+        if field == 'id' and id_offset != 0:
+            column = column + id_offset
+        elif field == 'connection-id' and connection_id_offset != 0:
+            column = column + connection_id_offset
+        return column
+
+    def mask(self, batch, id_offset=0, connection_id_offset=0, constants={}):
+        """Evaluates the filter on a batch of requests. Each referenced field is extracted once
+        as a column; the conditions are then evaluated on whole columns.
+
+        Args:
+            batch (list of dict): raw requests
+            id_offset (int, optional): offset added to `id` before comparing. Defaults to 0.
+            connection_id_offset (int, optional): offset added to `connection-id` before comparing. Defaults to 0.
+            constants (dict, optional): fields with the same value for the whole batch, e.g. `type` and `corpus`. Defaults to {}.
+
+        Returns:
+            np.ndarray: boolean mask, True for requests passing the filter
+        """
+        mask = np.ones(len(batch), dtype=np.bool_)
+        columns = {}
+        for field, keys, op, value in self.conditions:
+            if field not in columns:
+                columns[field] = self._column(batch, field, keys, id_offset, connection_id_offset, constants)
+            column = columns[field]
+
+            if op == 'eq':
+                result = column == value
+            elif op == 'ne':
+                result = column != value
+            elif op == 'in':
+                result = column.isin(value)
+            elif op == 'not_in':
+                result = ~column.isin(value)
+            elif op == 'range':
+                numbers = pd.to_numeric(column, errors='coerce')
+                result = numbers.notna()
+                if value[0] is not None:
+                    result &= numbers >= value[0]
+                if value[1] is not None:
+                    result &= numbers <= value[1]
+            else:
+                result = column.str.contains(value, regex=True, na=False)
+
+            mask &= result.to_numpy(dtype=np.bool_, na_value=False)
+            if not mask.any():
+                break
+        return mask
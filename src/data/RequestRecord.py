@@ -0,0 +1,295 @@
+from collections import OrderedDict
+from collections.abc import Mapping
+import sys
+
+
+class PairsView(Mapping):
+    """Read-only mapping over a tuple of `(key, value)` pairs, e.g. an HTTP header.
+
+    Compared to a dict, it needs a fraction of the memory and can be shared by all
+    requests with the same pairs. Lookups scan the pairs, which is fast for the few
+    entries of a header.
+    """
+    __slots__ = ('pairs',)
+
+    def __init__(self, pairs):
+        self.pairs = pairs
+
+    def __getitem__(self, key):
+        for k, v in self.pairs:
+            if k == key:
+                return v
+        raise KeyError(key)
+
+    def __contains__(self, key):
+        for k, _ in self.pairs:
+            if k == key:
+                return True
+        return False
+
+    def __iter__(self):
+        return (k for k, _ in self.pairs)
+
+    def __len__(self):
+        return len(self.pairs)
+
+    def items(self):
+        return self.pairs
+
+    def __repr__(self):
+        return f"PairsView({dict(self.pairs)})"
+
+    def to_dict(self):
+        return dict(self.pairs)
+
+
+class _RecordView(Mapping):
+    """Read-only mapping view of a nested part of a `RequestRecord` (e.g. `request` or
+    `honeypot`). Values are read from the record, nothing is copied.
+    """
+    __slots__ = ('record',)
+    FIELDS = {}
+
+    def __init__(self, record):
+        self.record = record
+
+    def __getitem__(self, key):
+        try:
+            return getattr(self.record, self.FIELDS[key])
+        except KeyError:
+            raise KeyError(key) from None
+
+    def __iter__(self):
+        return iter(self.FIELDS)
+
+    def __len__(self):
+        return len(self.FIELDS)
+
+    def __repr__(self):
+        return repr(self.to_dict())
+
+    def to_dict(self):
+        return {key: _to_plain(value) for key, value in self.items()}
+
+
+class _RequestView(_RecordView):
+    __slots__ = ()
+    FIELDS = {'method': 'method', 'uri': 'uri', 'protocol': 'protocol', 'body': 'body'}
+
+
+class _SenderView(_RecordView):
+    __slots__ = ()
+    FIELDS = {'ip': 'ip'}
+
+
+class _HoneypotView(_RecordView):
+    __slots__ = ()
+    FIELDS = {
+        'used-emulator': 'used_emulator',
+        'response-hash': 'response_hash',
+        'response-size': 'response_size',
+        'response-status-code': 'response_status_code',
+        'response-header': 'response_header'
+    }
+
+
+def _to_plain(value):
+    return value.to_dict() if hasattr(value, 'to_dict') else value
+
+
+class RequestRecord(Mapping):
+    """Compact, slotted representation of a honeypot request.
+
+    All strings that repeat across requests (header names and values, methods, emulator
+    names, response hashes, IPs) are interned, and identical headers / bodies are shared
+    between records through a pool. The record behaves like the (read-only) nested dict
+    it was created from, e.g. `record['request']['uri']` or `record['header'].items()`,
+    so code that only reads requests accepts both. Only the top-level keys can be set
+    (e.g. `id`, `connection-id` or additional keys like `type`).
+    """
+    __slots__ = ('id', 'timestamp', 'connection_id', 'method', 'uri', 'protocol', 'body', 'header',
+                 'ip', 'used_emulator', 'response_hash', 'response_size', 'response_status_code',
+                 'response_header', 'extra')
+
+    TOP_LEVEL = {'id': 'id', 'timestamp': 'timestamp', 'connection-id': 'connection_id'}
+    VIEWS = {'request': _RequestView, 'sender': _SenderView, 'honeypot': _HoneypotView}
+
+    @classmethod
+    def from_dict(cls, obj, pool=None):
+        """Creates a record from a request in our format.
+
+        Args:
+            obj (dict): request object
+            pool (dict, optional): pool for sharing headers and bodies between records (e.g., one
+                per loaded file). Defaults to None (no sharing beyond interned strings).
+
+        Returns:
+            RequestRecord: compact record
+        """
+        if pool is None:
+            pool = {}
+        request = obj['request']
+        honeypot = obj['honeypot']
+
+        record = cls.__new__(cls)
+        record.id = obj['id']
+        record.timestamp = obj['timestamp']
+        record.connection_id = obj['connection-id']
+        record.method = _intern(request['method'])
+        record.uri = request['uri']
+        record.protocol = _intern(request['protocol'])
+        record.body = _pairs(request['body'], pool) if isinstance(request['body'], Mapping) else request['body']
+        record.header = _pairs(obj['header'], pool)
+        record.ip = _intern(obj['sender']['ip'])
+        record.used_emulator = _intern(honeypot['used-emulator'])
+        record.response_hash = _intern(honeypot['response-hash'])
+        record.response_size = honeypot['response-size']
+        record.response_status_code = honeypot['response-status-code']
+        record.response_header = _pairs(honeypot['response-header'], pool)
+
+        extra = {key: value for key, value in obj.items() if key not in cls.TOP_LEVEL and key not in cls.VIEWS and key != 'header'}
+        record.extra = extra if extra else None
+        return record
+
+    def __getitem__(self, key):
+        if key in self.TOP_LEVEL:
+            return getattr(self, self.TOP_LEVEL[key])
+        if key == 'header':
+            return self.header
+        if key in self.VIEWS:
+            return self.VIEWS[key](self)
+        if self.extra is not None and key in self.extra:
+            return self.extra[key]
+        raise KeyError(key)
+
+    def __setitem__(self, key, value):
+        if key in self.TOP_LEVEL:
+            setattr(self, self.TOP_LEVEL[key], value)
+        elif key == 'header' or key in self.VIEWS:
+            raise TypeError(f"'{key}' of a RequestRecord is read-only.")
+        else:
+            if self.extra is None:
+                self.extra = {}
+            self.extra[key] = value
+
+    def __iter__(self):
+        yield from self.TOP_LEVEL
+        yield from self.VIEWS
+        yield 'header'
+        if self.extra is not None:
+            yield from self.extra
+
+    def __len__(self):
+        return len(self.TOP_LEVEL) + len(self.VIEWS) + 1 + (len(self.extra) if self.extra is not None else 0)
+
+    def __repr__(self):
+        return f"RequestRecord({self.to_dict()})"
+
+    def to_dict(self):
+        """Converts the record back into a request in our format (nested dicts).
+
+        Returns:
+            dict: request object
+        """
+        return {key: _to_plain(value) for key, value in self.items()}
+
+    def without_headers(self, keys):
+        """Creates a copy of the record without the given request headers. Everything else
+        is shared with this record.
+
+        Args:
+            keys (list of str): header names to remove
+
+        Returns:
+            RequestRecord: new record
+        """
+        record = RequestRecord.__new__(RequestRecord)
+        for slot in self.__slots__:
+            setattr(record, slot, getattr(self, slot))
+        record.header = PairsView(tuple((k, v) for k, v in self.header.pairs if k not in keys))
+        if self.extra is not None:
+            record.extra = dict(self.extra)
+        return record
+
+
+class PairsPool():
+    """Bounded pool of shared `PairsView`s (usable wherever a pool dict is accepted): when
+    it is full, the least recently used view is dropped from the pool. Records keep their
+    views alive, so dropping only ends the sharing of rarely repeated pairs (e.g., response
+    headers with a per-second `Date`), it never changes a record.
+    """
+
+    def __init__(self, max_size=10000):
+        """Constructor.
+
+        Args:
+            max_size (int, optional): maximum number of pooled views. Defaults to 10000.
+        """
+        self.max_size = max_size
+        self.views = OrderedDict()
+
+    def __len__(self):
+        return len(self.views)
+
+    def get(self, pairs):
+        view = self.views.get(pairs)
+        if view is not None:
+            self.views.move_to_end(pairs)
+        return view
+
+    def __setitem__(self, pairs, view):
+        self.views[pairs] = view
+        if len(self.views) > self.max_size:
+            self.views.popitem(last=False)
+
+
+def _intern(value):
+    return sys.intern(value) if type(value) is str else value
+
+
+def _pairs(mapping, pool):
+    """Converts a dict into a `PairsView` with interned keys and values. Identical views
+    are taken from / added to `pool`.
+    """
+    pairs = tuple((_intern(k), _intern(v)) for k, v in mapping.items())
+    try:
+        view = pool.get(pairs)
+        if view is None:
+            view = pool[pairs] = PairsView(pairs)
+    except TypeError:
+        # unhashable values (e.g., lists in a body) cannot be shared
+        view = PairsView(pairs)
+    return view
+
+
+def to_request_records(requests, pool=None):
+    """Converts request objects into compact records one at a time.
+
+    Args:
+        requests (iterable of dict): request objects
+        pool (dict, optional): pool for sharing headers and bodies between the records. Defaults to None (new pool).
+
+    Yields:
+        RequestRecord: compact record
+    """
+    if pool is None:
+        pool = {}
+    for obj in requests:
+        yield obj if isinstance(obj, RequestRecord) else RequestRecord.from_dict(obj, pool)
+
+
+def record_to_json(obj):
+    """`default` hook for `json.dumps` to serialize records and their views.
+
+    Args:
+        obj (object): object that json cannot serialize itself
+
+    Raises:
+        TypeError: if `obj` is neither a record nor one of its views
+
+    Returns:
+        dict: serializable representation
+    """
+    if isinstance(obj, (RequestRecord, PairsView, _RecordView)):
+        return obj.to_dict()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
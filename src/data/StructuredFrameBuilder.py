@@ -0,0 +1,185 @@
+from array import array
+from collections.abc import Mapping
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+from src.transformation.HTTPTransformer import HTTPTransformer
+from src.transformation.ZAPIDTransformer import get_zap_lookup
+from src.transformation.HTTPHeaders import HTTP_RELEVANT_HEADERS, get_header_encoder
+
+
+class StructuredFrameBuilder():
+    """Builds the structured request dataframe column by column.
+
+    Instead of creating a dict per request and letting pandas infer the schema, every
+    feature is appended directly to a typed column: categorical codes for label, method
+    and origin, float32 for lengths and bool for the presence of headers. URIs and bodies
+    are only collected (as codes of their distinct values) and transformed in one batch
+    when the dataframe is created.
+    """
+
+    CATEGORICAL_COLUMNS = ['label', 'method', 'data_origin', 'data_tool']
+    STRING_COLUMNS = ['original-zap-id']
+    LENGTH_COLUMNS = ['request-length', 'uri-length', 'body-length']
+
+    def __init__(self, proj_root, headers=HTTP_RELEVANT_HEADERS, with_origin=False, n_workers=1):
+        """Constructor.
+
+        Args:
+            proj_root (str): path to project root
+            headers (list of str, optional): headers to create presence columns for. Defaults to HTTP_RELEVANT_HEADERS.
+            with_origin (bool, optional): add the `data_origin` and `data_tool` columns. Defaults to False.
+            n_workers (int, optional): number of worker processes transforming the distinct URIs
+                and bodies. Defaults to 1.
+        """
+        self.zapper = get_zap_lookup(proj_root)
+        self.headers = headers
+        self.with_origin = with_origin
+        self.n_workers = n_workers
+
+        categoricals = self.CATEGORICAL_COLUMNS if with_origin else self.CATEGORICAL_COLUMNS[:2]
+        self.codes = {name: array('i') for name in categoricals}
+        self.categories = {name: {} for name in categoricals}
+        self.strings = {name: [] for name in self.STRING_COLUMNS}
+        self.lengths = {name: array('f') for name in self.LENGTH_COLUMNS}
+        # present headers per request in CSR layout (see `HeaderEncoder.to_matrix`)
+        self.header_encoder = get_header_encoder(headers, case_sensitive=True)
+        self.header_indptr = array('q', [0])
+        self.header_indices = array('i')
+        # distinct URIs and bodies (transformed in `to_dataframe`) and their codes per request
+        self.uri_codes = array('i')
+        self.uri_index = {}
+        self.body_codes = array('i')
+        self.body_index = {}
+        self.body_values = []
+
+    def __len__(self):
+        return len(self.codes['label'])
+
+    def _append_category(self, column, value):
+        categories = self.categories[column]
+        code = categories.get(value)
+        if code is None:
+            code = categories[value] = len(categories)
+        self.codes[column].append(code)
+
+    def _append_uri(self, uri):
+        code = self.uri_index.get(uri)
+        if code is None:
+            code = self.uri_index[uri] = len(self.uri_index)
+        self.uri_codes.append(code)
+
+    def _append_body(self, body):
+        try:
+            key = tuple(body.items()) if isinstance(body, Mapping) else body
+            code = self.body_index.get(key)
+            if code is None:
+                code = self.body_index[key] = len(self.body_values)
+                self.body_values.append(body)
+        except TypeError:
+            # unhashable values, no deduplication
+            code = len(self.body_values)
+            self.body_values.append(body)
+        self.body_codes.append(code)
+
+    def append(self, x, origin=None, tool=None):
+        """Appends a single request object.
+
+        Args:
+            x (dict): request object
+            origin (str, optional): origin (file name) of the request. Defaults to None.
+            tool (str, optional): tool that created the request. Defaults to None.
+        """
+        request = x['request']
+        header = x['header']
+
+        if 'X-ZAP-Scan-ID' in header:
+            self._append_category('label', self.zapper.id_to_rule(header['X-ZAP-Scan-ID']))
+            self.strings['original-zap-id'].append(header['X-ZAP-Scan-ID'])
+        else:
+            self._append_category('label', "no zap id")
+            self.strings['original-zap-id'].append("no zap id")
+        self._append_category('method', request['method'])
+        if self.with_origin:
+            self._append_category('data_origin', origin)
+            self._append_category('data_tool', tool)
+
+        self._append_uri(request['uri'])
+        self._append_body(request['body'])
+
+        self.lengths['request-length'].append(float(header["Content-Length"]) if "Content-Length" in header else -1.0)
+        self.lengths['uri-length'].append(len(request['uri']))
+        self.lengths['body-length'].append(len(request['body']))
+
+        self.header_indices.extend(self.header_encoder.indices(header))
+        self.header_indptr.append(len(self.header_indices))
+
+    def extend(self, requests, origin=None, tool=None):
+        """Appends all given request objects.
+
+        Args:
+            requests (iterable of dict): request objects
+            origin (str, optional): origin (file name) of the requests. Defaults to None.
+            tool (str, optional): tool that created the requests. Defaults to None.
+        """
+        for x in requests:
+            self.append(x, origin, tool)
+
+    def _categorical(self, column):
+        return pd.Categorical.from_codes(_int_array(self.codes[column]), categories=list(self.categories[column]))
+
+    def to_dataframe(self):
+        """Creates the dataframe from the collected columns.
+
+        Returns:
+            pd.DataFrame: structured data
+        """
+        n = len(self)
+        # transform every distinct URI / body once
+        uri_codes = _int_array(self.uri_codes)
+        uris = HTTPTransformer.transform_uris(list(self.uri_index), n_workers=self.n_workers)
+        bodies = HTTPTransformer.handle_bodies(self.body_values, n_workers=self.n_workers)
+        columns = {
+            'label': self._categorical('label'),
+            'original-zap-id': self.strings['original-zap-id'],
+            'method': self._categorical('method'),
+            'uri-path': uris['path'].to_numpy(dtype=object)[uri_codes],
+            'uri-query': uris['query'].to_numpy(dtype=object)[uri_codes],
+            'body': bodies.to_numpy(dtype=object)[_int_array(self.body_codes)],
+        }
+        for name in self.LENGTH_COLUMNS:
+            columns[name] = np.frombuffer(self.lengths[name], dtype=np.float32) if n > 0 else np.zeros(0, dtype=np.float32)
+        columns['uri-decode-depth'] = uris['decode-depth'].to_numpy(dtype=np.float32)[uri_codes]
+        header_matrix = self.header_encoder.to_matrix(self.header_indptr, self.header_indices)
+        for column, name in enumerate(self.header_encoder.headers):
+            columns[name] = header_matrix[:, column]
+        if self.with_origin:
+            columns['data_origin'] = self._categorical('data_origin')
+            columns['data_tool'] = self._categorical('data_tool')
+
+        return pd.DataFrame(columns)
+
+
+def _int_array(values):
+    return np.frombuffer(values, dtype=np.int32) if len(values) > 0 else np.zeros(0, dtype=np.int32)
+
+
+def concat_structured_frames(frames):
+    """Concatenates structured dataframes (e.g., built in different processes) while
+    keeping categorical columns categorical.
+
+    Args:
+        frames (list of pd.DataFrame): structured dataframes with identical columns
+
+    Returns:
+        pd.DataFrame: concatenated dataframe
+    """
+    if len(frames) == 1:
+        return frames[0]
+    df = pd.concat(frames, ignore_index=True)
+    for column in StructuredFrameBuilder.CATEGORICAL_COLUMNS:
+        if column in df.columns:
+            df[column] = union_categoricals([frame[column] for frame in frames])
+    return df
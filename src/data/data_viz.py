@@ -4,7 +4,7 @@ import seaborn as sns
 import matplotlib.pyplot as plt
 from matplotlib.gridspec import GridSpec
 
-from src.transformation.ZAPIDTransformer import ZAPIDTransformer
+from src.transformation.ZAPIDTransformer import get_zap_lookup
 
 def create_id_count_plot(df, filename, proj_root, path_to_plot_dir='', figsize=(12, 8), height_ratios=[3,1]):
     """Creates a count bar plot for attack dypes.
@@ -39,7 +39,7 @@ def create_id_count_plot(df, filename, proj_root, path_to_plot_dir='', figsize=(
     ax.set_title(f"Attack Type Counts for {filename}")
     ax.set_xticklabels(labels=ax.get_xticklabels(), rotation=45)
 
-    zapper = ZAPIDTransformer(proj_root)
+    zapper = get_zap_lookup(proj_root)
     
     # Table 1 (counts per ID)
     col_labels = ['counts', 'perc']
@@ -1,11 +1,52 @@
 import json
-import datetime, time 
-import ipaddress
-import re
-from urllib.parse import unquote
+import time
+import heapq
+import os
+import tempfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import groupby, repeat
+
+from src.data.RequestRecord import PairsPool, RequestRecord, record_to_json
+from src.transformation.RequestTextExtractor import RequestTextExtractor
+from src.utils.json_stream import iter_json_records
+from src.utils.list_utils import iter_chunks
+
+# number of raw requests a declarative filter is evaluated on at once
+FILTER_BATCH_SIZE = 10000
+# number of distinct headers and bodies shared by the compact records of a dataset
+COMPACT_POOL_SIZE = 10000
+# extractor of a worker process converting requests into texts (see `iter_with_texts`)
+_worker_request_to_text = None
+
+class WindowDocument(dict):
+	"""A document of a request window which references the texts of the requests of its
+	connection instead of holding a copy. The text is joined whenever `document` is read.
+	"""
+
+	def __init__(self, request_texts, connection, start, length, fields):
+		"""Constructor.
+
+		Args:
+			request_texts (array of array of str): The texts of all requests, per connection.
+			connection (int): The index of the connection in `request_texts`.
+			start (int): The index of the first request of the window.
+			length (int): The number of requests in the window.
+			fields (dict): The other fields of the document (corpus, type, ...).
+		"""
+		super().__init__(fields)
+		self['window'] = [connection, start, length]
+		self.request_texts = request_texts
+
+	def __missing__(self, key):
+		if key == 'document':
+			connection, start, length = self['window']
+			return ' '.join(self.request_texts[connection][start:start + length])
+		raise KeyError(key)
 
 def getTextFromRequest(request, settings):
-	"""Converts a JSON request into text.
+	"""Converts a JSON request into text. The settings are compiled on every call; to
+	transform many requests, compile them once with `RequestTextExtractor.from_settings`.
 
 	Args:
 		request (dict): The JSON request to transform into text.
@@ -14,159 +55,51 @@ def getTextFromRequest(request, settings):
 	Returns:
 		str: The transformed request.
 	"""
-	regToCategory = {
-		'alphanum' : r'[A-Za-z0-9]',
-		'onlyText' : r'^[ \,\:\.\!\?\;A-Za-z0-9]+$',
-		'alpha' : r'[A-Za-z]',
-		'alphaUpper' : r'[A-Z]',
-		'alphaLower' : r'[a-z]',
-		'url' : r'[/?&]',
-		'email' : r'\w+@\w+\.\w',
-		'tag' : r'[<>/]',
-		'function' : r'\(.*\) *;?',
-		'num' : r'\d*[.,]?\d+',
-		'onlyNum' : r'^\d*[.,]?\d+$',
-		'short_string' : r'^.{1,100}$',
-		'empty' : r'^$',
-		'long_string' : r'^.{101}.*$',
-		'reversepath' : r'\.\.(\/|\\)'
-	}
-
-	def headerToText(header, isRequest=False, isResponse=False):
-		"""Converts a HTTP header into a list of words. Several value parameters are transformed:
-		- Version numbers are deleted or replaced by the string 'version'
-		- For dates, minutes and seconds are removed
-		- And others (see code).
-
-		Args:
-			header (dict): HTTP header as dict (representing the key-value pairs)
-			isRequest (bool, optional): Flag for request header. Defaults to False.
-			isResponse (bool, optional): Flag for response header. Defaults to False.
-
-		Returns:
-			list: A list of words generated from the header.
-		"""
-		t = []
-
-		if isRequest:
-			typePrefix = "request"
-		elif isResponse:
-			typePrefix = "response"
-		else:
-			typePrefix = ""			
-
-		for key,value in header.items():
-			key_low = key.lower()
-			if key_low == 'cookie':
-				t.append(paramsToText(value, prefix=typePrefix + '_cookie', delimiter=';'))
-			elif key_low != 'x-zap-scan-id': # nothing to do for 'x-zap-scan-id' (internal zap flag for later classification)
-				
-				if key_low not in ['accept', 'accept-encoding', 'accept-language', 'cache-control', 'connection', 'content-length', 'content-type', 'referer']:
-					t.append( typePrefix + '_header_' + key_low)
-			
-				if key_low in ['date', 'expires', 'last-modified', 'if-modified-since', 'if-unmodified-since']:
-					if settings['corpus']['use_times']:
-						t.append( re.sub(r':\d\d:\d\d', '', value).replace(' ', '') )
-				elif key_low in ['x-powered-by', 'server', 'user-agent']: 
-					t.append( re.sub(r'(\d+(.|_))*\d+', 'version', value).replace(' ', '') )
-				#elif key_low in ['accept', 'accept-language']: 
-				#	t.append( re.sub(r';?q=[\d.]+', '', value).replace(' ', '') )
-				elif key_low in ['accept', 'accept-encoding', 'accept-language', 'connection', 'referer']:
-					pass
-				else:
-					t.append( re.sub(r'[^a-zA-Z0-9]', '', value) )
-		return t
-
-	def bodyToText(body):
-		"""Converts the body of a HTTP post request into a string of words. The
-		words represent the relevant classes of characters which appear in the value,
-		e.g. value_alphanum for alphanumerical characters (for the complete list,
-		see the dict called regToCategory above). Example: `key=123` becomes
-		`post_key value_alphanum value_onlyText value_short_string value_num value_onlyNum`.
-
-		Args:
-			body (dict): HTTP body key-value pairs.
-
-		Returns:
-			str: transformed body.
-		"""
-		t = ""
-		for name, value in body.items():
-			if t != "":
-				t += " "
-
-			t += "post_" + name
-			for category, regex in regToCategory.items():
-				t += "" if re.search(regex, value) == None else " value_" + category
-		return t
-
-	def paramsToText(params, prefix='get', delimiter='&'):
-		"""Converts url parameters into a string of words. The words represent the
-		relevant classes of characters which appear in the values of the key-value
-		pairs. This is analogous to the `bodyToText` function.
+	return RequestTextExtractor.from_settings(settings)(request)
 
-		Args:
-			params (str): The url parameters to transform.
-			prefix (str, optional): Prefix specifying the request type. Defaults to 'get'.
-			delimiter (str, optional): The delimiter at which the parameters are split. Defaults to '&'.
+def _init_text_worker(settings):
+	global _worker_request_to_text
+	_worker_request_to_text = RequestTextExtractor.from_settings(settings)
 
-		Returns:
-			str: transformed url parameters.
-		"""
-		t = ""
-		for param in params.split(delimiter):
-			if t != "":
-				t += " "
-
-			parts = param.split('=')
-			if len(parts) > 1:
-				name, value = parts[0], parts[1]
-
-				value_last = None # double url decode
-				while value_last != value:
-					value_last = value
-					value = unquote(value)
-
-				t += prefix + "_" + name
-				for category, regex in regToCategory.items():
-					t += "" if re.search(regex, value) == None else " value_" + category
-			else:
-				t += prefix + "_" + param
-
-		return t
-
-	text = []
-	text.extend(headerToText(request['header'], isRequest=True))
-	text.extend(headerToText(request['honeypot']['response-header'], isResponse=True))
-	if settings['corpus']['use_times']:
-		text.append(datetime.datetime.fromtimestamp(request['timestamp']).fromtimestamp(request['timestamp']).strftime("request_day_%a request_hour_%H request_minute_%M"))
-	text.append('request_method_' + request['request']['method'] + ' request_protocol_' + request['request']['protocol'])
-	text.append(request['honeypot']['response-hash'] + " response_size_" + str(request['honeypot']['response-size'])
-		+ " response_status_" + str(request['honeypot']['response-status-code']) )
-
-	# url as two parts => path to file and get params
-	if '?' in request['request']['uri']:
-		filepart = request['request']['uri'][0:request['request']['uri'].find('?')]
-		text.append(paramsToText(request['request']['uri'][request['request']['uri'].find('?')+1:]))
-	else:
-		filepart = request['request']['uri']
-	
-	path_string = 'path_'
-	text.append( path_string )
-	for path in filepart.split('/'):
-		if path != "":
-			path_string += 'file_' if '.' in path else 'folder_'
-			text.append( path_string )
+def _chunk_to_texts(chunk):
+	return [[_worker_request_to_text(r) for r in requests] for requests in chunk]
 
-	if request['request']['method'] == "POST":
-		text.append(bodyToText(request['request']['body']))
+def iter_with_texts(items, settings, documents=None):
+	"""Converts requests into texts, with `corpus.n_workers` > 1 in chunks of
+	`corpus.text_chunk_size` items on a pool of worker processes. The items are read lazily
+	(only a bounded number of chunks is in flight) and yielded in their original order.
 
-	ip_object = ipaddress.ip_address(request['sender']['ip'])
-	text.append( ("private_ip " if ip_object.is_private else "" )
-			+ ( "global_ip " if ip_object.is_global else "" )
-			+ ( "reserved_ip" if ip_object.is_reserved else "" ) )
+	Args:
+		items (iterable): The requests or the connections (see `iter_connections`).
+		settings (dict): The settings object for all kinds of parameters.
+		documents (str, optional): The key of the list of requests of an item (e.g. 'document'
+		for connections). Defaults to None (each item is a request).
 
-	return ' '.join(text).lower()
+	Yields:
+		tuple: (item, text of the request or list of texts of the requests of the item)
+	"""
+	n_workers = settings['corpus'].get('n_workers', 1)
+	# a request is handled like a connection with a single request
+	get_requests = (lambda item : [item]) if documents is None else (lambda item : item[documents])
+	get_result = (lambda texts : texts[0]) if documents is None else (lambda texts : texts)
+	if n_workers <= 1:
+		request_to_text = RequestTextExtractor.from_settings(settings)
+		for item in items:
+			yield item, get_result([request_to_text(r) for r in get_requests(item)])
+		return
+
+	chunk_size = settings['corpus'].get('text_chunk_size', 1000)
+	with ProcessPoolExecutor(max_workers=n_workers, initializer=_init_text_worker, initargs=(settings,)) as executor:
+		pending = deque()
+		for chunk in iter_chunks(items, chunk_size):
+			pending.append((chunk, executor.submit(_chunk_to_texts, [get_requests(item) for item in chunk])))
+			# keep the workers busy, but do not read ahead further
+			if len(pending) > 2 * n_workers:
+				chunk, future = pending.popleft()
+				yield from zip(chunk, map(get_result, future.result()))
+		while pending:
+			chunk, future = pending.popleft()
+			yield from zip(chunk, map(get_result, future.result()))
 
 def group_by_connection_id(requests):
 	"""Groups requests by their connection id, i.e., all requests with the same
@@ -196,96 +129,262 @@ def group_by_connection_id(requests):
 
 	return texts
 
-def prepare_corpus(settings, key):
-	"""Merges multiple datasets into one dataset to work with and groups requests by their
-	connection id if enabled. Optionally, datasets are being filtered as well (e.g. only use
-	data with a specific type of attack).
+def group_by_connection_id_external(requests, run_size=100000, tmp_dir=None):
+	"""Groups requests by their connection id like `group_by_connection_id`, but
+	out-of-core: the requests are written to sorted runs on disk, which are then merged
+	as a stream. Thus, only `run_size` requests and one connection are held in memory.
+	Within a connection, the original order of the requests is kept; the connections
+	themselves are yielded ordered by their connection id.
 
 	Args:
+		requests (iterable of dict): The requests to group.
+		run_size (int, optional): The number of requests sorted in memory per run. Defaults to 100000.
+		tmp_dir (str, optional): The directory for the temporary runs. Defaults to the system's temp directory.
+
+	Yields:
+		dict: The requests of one connection (same format as the values of `group_by_connection_id`).
+	"""
+	with tempfile.TemporaryDirectory(dir=tmp_dir) as run_dir:
+		# write sorted runs, the sequence number keeps the order within a connection
+		run_files = []
+		seq = 0
+		for chunk in iter_chunks(requests, run_size):
+			run = sorted(((request['connection-id'], seq + i, request) for i, request in enumerate(chunk)), key=lambda t: (t[0], t[1]))
+			seq += len(chunk)
+			run_file = os.path.join(run_dir, 'run_' + str(len(run_files)) + '.jsonl')
+			with open(run_file, 'w') as f:
+				for entry in run:
+					f.write(json.dumps(entry, default=record_to_json) + '\n')
+			run_files.append(run_file)
+			del run, chunk
+
+		def read_run(run_file):
+			with open(run_file, 'r') as f:
+				for line in f:
+					yield json.loads(line)
+
+		# merge runs and yield one connection at a time
+		merged = heapq.merge(*[read_run(run_file) for run_file in run_files], key=lambda t: (t[0], t[1]))
+		for _, entries in groupby(merged, key=lambda t: t[0]):
+			connection = None
+			for _, _, request in entries:
+				if connection is None:
+					connection = {
+						"corpus" : request['corpus'],
+						"type" : request['type'],
+						"emulator" : [],
+						"zap-id" : [],
+						"document" : []
+					}
+				connection['emulator'].append(request['honeypot']['used-emulator'])
+				connection['zap-id'].append(request['zap-id'])
+				connection['document'].append(request)
+			yield connection
+
+def iter_connections(requests, settings):
+	"""Groups requests by their connection id, in memory or (if `corpus.external_grouping`
+	is set) out-of-core.
+
+	Args:
+		requests (iterable of dict): The requests to group.
 		settings (dict): The settings object for all kinds of parameters.
-		key (str): The key to the dataset which should be prepared, e.g.
-		'training_data' or 'test_data'.
 
 	Returns:
-		array of dict: The corpus of text documents.
+		(iterable of dict): The requests grouped per connection.
 	"""
+	if settings['corpus'].get('external_grouping', False):
+		return group_by_connection_id_external(requests,
+			run_size=settings['corpus'].get('grouping_run_size', 100000),
+			tmp_dir=settings['corpus'].get('grouping_tmp_dir', None))
+	return group_by_connection_id(requests).values()
+
+def load_requests(settings, key):
+	"""Reads the requests of all datasets one after another and prepares them for the
+	corpus generation (unique ids, type, zap-id and corpus name). Optionally, requests
+	are filtered (see `filter` in the settings). With `corpus.compact_requests`, accepted
+	requests are converted into compact `RequestRecord`s.
+
+	Args:
+		settings (dict): The settings object for all kinds of parameters.
+		key (str): The key to the datasets which should be read, e.g.
+		'training_data' or 'test_data'.
 
-	# read all data from json into one big array
-	requests = []
+	Yields:
+		dict or RequestRecord: The prepared requests which passed the filter.
+	"""
+	compact = settings['corpus'].get('compact_requests', False)
 	#	make sure to have unique ids and connections ids
 	overallIdOffset = 0
 	overallConnectionIdOffset = 0
 	for dataset in settings[key]:
 
-		# allow filtering from settings
-		if 'filter' in dataset:
+		# allow filtering from settings: a declarative filter is evaluated on batches of raw
+		# requests (rejected requests are never prepared), a lambda expression per prepared request
+		request_filter = None
+		filter_request = lambda r : True
+		if isinstance(dataset.get('filter'), dict):
+			# imported here: the filter needs pandas, which the LDA image does not install
+			from src.data.RequestFilter import RequestFilter
+			request_filter = RequestFilter(dataset['filter'])
+		elif 'filter' in dataset:
 			filter_request = eval("lambda r : " + dataset['filter'])
-		else:
-			filter_request = lambda r : True
+		constants = { 'type' : dataset['type'], 'corpus' : dataset['name'] }
+		# headers and bodies shared by the compact records of the dataset (bounded, so memory
+		#	does not grow with the number of distinct, e.g. timestamped, response headers)
+		pool = PairsPool(COMPACT_POOL_SIZE)
 
 		idMax = -1
 		connectionIdMax = -1
-		dataPart = json.load(open(dataset['file'], 'r'))
-		for request in dataPart:
-			request['id'] += overallIdOffset
-			request['connection-id'] += overallConnectionIdOffset
-			request['type'] = dataset['type']
-			request['zap-id'] = str(request['header']['X-ZAP-Scan-ID']) if 'X-ZAP-Scan-ID' in request['header'] else '-1'
-			request['corpus'] = dataset['name']
-			if filter_request(request):
-				requests.append(request)
-
-			if idMax < request['id']:
-				idMax = request['id']
-			if connectionIdMax < request['connection-id']:
-				connectionIdMax = request['connection-id']
-			
+		# JSON arrays and JSON Lines are both read one request at a time
+		for batch in iter_chunks(iter_json_records(dataset['file']), FILTER_BATCH_SIZE):
+			if request_filter is not None:
+				mask = request_filter.mask(batch, overallIdOffset, overallConnectionIdOffset, constants)
+			else:
+				mask = repeat(True)
+
+			for request, accepted in zip(batch, mask):
+				# rejected requests still count for the id offsets
+				if idMax < request['id'] + overallIdOffset:
+					idMax = request['id'] + overallIdOffset
+				if connectionIdMax < request['connection-id'] + overallConnectionIdOffset:
+					connectionIdMax = request['connection-id'] + overallConnectionIdOffset
+				if not accepted:
+					continue
+
+				if compact:
+					request = RequestRecord.from_dict(request, pool)
+				request['id'] += overallIdOffset
+				request['connection-id'] += overallConnectionIdOffset
+				request['type'] = dataset['type']
+				request['zap-id'] = str(request['header']['X-ZAP-Scan-ID']) if 'X-ZAP-Scan-ID' in request['header'] else '-1'
+				request['corpus'] = dataset['name']
+				if filter_request(request):
+					yield request
+
 		overallIdOffset += idMax + 1
 		overallConnectionIdOffset += connectionIdMax + 1
 
+def prepare_corpus(settings, key):
+	"""Merges multiple datasets into one dataset to work with and groups requests by their
+	connection id if enabled. Optionally, datasets are being filtered as well (e.g. only use
+	data with a specific type of attack).
+
+	Args:
+		settings (dict): The settings object for all kinds of parameters.
+		key (str): The key to the dataset which should be prepared, e.g.
+		'training_data' or 'test_data'.
+
+	Returns:
+		array of dict: The corpus of text documents.
+	"""
+
+	# read all data from json (requests are read lazily while the texts are built)
+	requests = load_requests(settings, key)
+
 	# preprocess texts
 	if settings['corpus']['document_per_request'] ^ settings['corpus']['document_per_connection_id']:
 		if settings['corpus']['document_per_request']:
 			texts = []
-			for request in requests:
+			for request, text in iter_with_texts(requests, settings):
 				texts.append({
 					"corpus" : request['corpus'],
 					"type" : request['type'],
 					"emulator" : request['honeypot']['used-emulator'],
 					"zap-id" : request['zap-id'],
-					"document" : getTextFromRequest(request, settings)
+					"document" : text
 				})
 		else:
 			texts = []
-			for request in group_by_connection_id(requests).values():
+			for request, request_texts in iter_with_texts(iter_connections(requests, settings), settings, documents='document'):
 				request['emulator'] = ' '.join(request['emulator'])
 				request['zap-id'] = ' '.join(request['zap-id'])
-				request['document'] = ' '.join([getTextFromRequest(r, settings) for r in request['document']])
+				request['document'] = ' '.join(request_texts)
 				texts.append(request)
 	elif settings['corpus']['document_request_window_size'] > 0:
+		window_size = settings['corpus']['document_request_window_size']
+		store_references = settings['corpus'].get('store_window_references', False)
+		request_texts = []
 		texts = []
-		for request in group_by_connection_id(requests).values():
-			len_minus_window = len(request['emulator']) - settings['corpus']['document_request_window_size']
+		# each request is transformed once and shared by all windows containing it
+		for request, connection_texts in iter_with_texts(iter_connections(requests, settings), settings, documents='document'):
+			request_texts.append(connection_texts)
+
+			len_minus_window = len(request['emulator']) - window_size
 			for begin in range(1 if len_minus_window < 1 else len_minus_window):
-				end = begin + settings['corpus']['document_request_window_size']
-				texts.append({
+				end = begin + window_size
+				fields = {
 					"corpus" : request['corpus'],
 					"type" : request['type'],
 					"emulator" : ' '.join(request['emulator'][begin:end]),
-					"zap-id" : ' '.join(request['zap-id'][begin:end]),
-					"document" : ' '.join([getTextFromRequest(r, settings) for r in request['document'][begin:end]])
-				})
+					"zap-id" : ' '.join(request['zap-id'][begin:end])
+				}
+				if store_references:
+					texts.append(WindowDocument(request_texts, len(request_texts) - 1, begin, min(window_size, len(connection_texts) - begin), fields))
+				else:
+					fields['document'] = ' '.join(connection_texts[begin:end])
+					texts.append(fields)
 	else:
 		print('Set exactly one of corpus.document_per_connection_id and corpus.document_per_request to True or give a window size corpus.document_request_window_size!')
 		exit()
 
 	return texts
 
-def main(settings):
-	f = open(settings['output']['dir'] + 'processed/' + settings['output']['name'] + '_trainset.json', "w+")
-	f.write(json.dumps(prepare_corpus(settings, 'training_data'), indent=4, sort_keys=False))
-	f.close()
+def corpus_to_json(texts):
+	"""Serializes a corpus of text documents. If the documents are window references (see
+	`WindowDocument`), the shared request texts are stored once next to the documents.
+
+	Args:
+		texts (array of dict): The corpus of text documents.
+
+	Returns:
+		(dict or array of dict): The JSON serializable corpus.
+	"""
+	if len(texts) > 0 and isinstance(texts[0], WindowDocument):
+		return {
+			"request_texts" : texts[0].request_texts,
+			"documents" : texts
+		}
+	return texts
+
+def load_corpus(file_path):
+	"""Loads a corpus of text documents written by `main`. Window references are resolved
+	lazily, i.e., the text of a window document is only joined when `document` is read.
+
+	Args:
+		file_path (str): The path to the corpus file.
 
-	f = open(settings['output']['dir'] + 'processed/' + settings['output']['name'] + '_testset.json', "w+")
-	f.write(json.dumps(prepare_corpus(settings, 'test_data'), indent=4, sort_keys=False))
-	f.close()
\ No newline at end of file
+	Returns:
+		(array of dict): The corpus of text documents.
+	"""
+	with open(file_path, 'r') as f:
+		corpus = json.load(f)
+	if isinstance(corpus, dict):
+		request_texts = corpus['request_texts']
+		return [WindowDocument(request_texts, *d.pop('window'), d) for d in corpus['documents']]
+	return corpus
+
+def write_corpus(settings, key, file_path):
+	"""Generates the corpus of a dataset (see `prepare_corpus`) and writes it to a JSON file.
+
+	Args:
+		settings (dict): The settings object for all kinds of parameters.
+		key (str): The key to the dataset, e.g. 'training_data' or 'test_data'.
+		file_path (str): The path to the corpus file.
+	"""
+	with open(file_path, "w+") as f:
+		f.write(json.dumps(corpus_to_json(prepare_corpus(settings, key)), indent=4, sort_keys=False))
+
+def main(settings):
+	corpora = {
+		'training_data' : settings['output']['dir'] + 'processed/' + settings['output']['name'] + '_trainset.json',
+		'test_data' : settings['output']['dir'] + 'processed/' + settings['output']['name'] + '_testset.json'
+	}
+	if settings['corpus'].get('n_workers', 1) > 1:
+		# train and test set are independent (own id offsets), so both are built concurrently
+		with ProcessPoolExecutor(max_workers=len(corpora)) as executor:
+			futures = [executor.submit(write_corpus, settings, key, file_path) for key, file_path in corpora.items()]
+			for future in futures:
+				future.result()
+	else:
+		for key, file_path in corpora.items():
+			write_corpus(settings, key, file_path)
@@ -0,0 +1,244 @@
+import json
+import os
+
+import numpy
+
+from src.utils.json_stream import iter_json_records
+
+# metadata columns of the documents of a bag of words corpus
+METADATA_COLUMNS = ['corpus', 'type', 'emulator', 'zap-id']
+
+def bow_format(settings):
+	"""Returns the format of the bag of words corpus (`features.bow_format`, defaults to `json`).
+
+	Args:
+		settings (dict): The settings object for all kinds of parameters.
+
+	Returns:
+		(str): `json` or `npy`.
+	"""
+	return settings.get('features', {}).get('bow_format', 'json')
+
+def bow_corpus_path(settings):
+	"""Returns the path of the bag of words corpus of the training set, depending on
+	`features.bow_format` (`json`: a single JSON file, `npy`: a directory of binary arrays).
+
+	Args:
+		settings (dict): The settings object for all kinds of parameters.
+
+	Returns:
+		(str): The path to the corpus file/ directory.
+	"""
+	base = settings['output']['dir'] + 'temp/' + settings['output']['name'] + '_bow'
+	return base + ('.json' if bow_format(settings) == 'json' else '')
+
+def write_bow_corpus(settings, corpusBow):
+	"""Writes a bag of words corpus in the format given by `features.bow_format`.
+
+	Args:
+		settings (dict): The settings object for all kinds of parameters.
+		corpusBow (array of dict): The bag of words corpus.
+	"""
+	if bow_format(settings) == 'json':
+		f = open(bow_corpus_path(settings), "w+")
+		f.write(json.dumps(corpusBow, sort_keys=False))
+		f.close()
+	else:
+		BowCorpus.write(bow_corpus_path(settings), corpusBow)
+
+def load_bow_corpus(settings):
+	"""Loads the bag of words corpus written by `write_bow_corpus`. Binary corpora are
+	memory mapped, i.e., they are read lazily and shared by all processes reading them. JSON
+	corpora are loaded as a whole or, with `lda.stream_corpus`, streamed from disk on each pass.
+	Binary corpora read the arrays of `lda.chunksize` documents at once.
+
+	Args:
+		settings (dict): The settings object for all kinds of parameters.
+
+	Returns:
+		(array of dict, JsonBowCorpus or BowCorpus): The bag of words corpus.
+	"""
+	if bow_format(settings) == 'json':
+		if settings['lda'].get('stream_corpus', False):
+			return JsonBowCorpus(bow_corpus_path(settings))
+		return json.load(open(bow_corpus_path(settings), 'r'))
+	return BowCorpus(bow_corpus_path(settings), settings['lda'].get('chunksize', 2000))
+
+def get_bows(corpus):
+	"""Returns the bag of words of all documents of a corpus (e.g. for gensim).
+
+	Args:
+		corpus (array of dict, JsonBowCorpus or BowCorpus): The bag of words corpus.
+
+	Returns:
+		(iterable of list): The bag of words of the documents (streamed for a `BowCorpus`
+		or `JsonBowCorpus`).
+	"""
+	if isinstance(corpus, (BowCorpus, JsonBowCorpus)):
+		return BowStream(corpus)
+	return [d['bow'] for d in corpus]
+
+class BowCorpus():
+	"""A bag of words corpus stored as binary arrays in a directory: the token ids and counts
+	of all documents as CSR arrays (`indptr.npy`, `indices.npy`, `counts.npy`) and the metadata
+	columns as codes (`<column>.npy`) into the categories stored in `meta.json`. The arrays are
+	memory mapped. Iterating yields the documents like the JSON corpus (dicts with `corpus`,
+	`type`, `emulator`, `zap-id` and `bow`).
+	"""
+
+	def __init__(self, path, chunksize=2000):
+		"""Constructor.
+
+		Args:
+			path (str): The path to the corpus directory.
+			chunksize (int, optional): The number of documents read at once by `iter_bows`. Defaults to 2000.
+		"""
+		self.path = path
+		self.chunksize = chunksize
+		with open(os.path.join(path, 'meta.json'), 'r') as f:
+			self.categories = json.load(f)['categories']
+		self.indptr = numpy.load(os.path.join(path, 'indptr.npy'), mmap_mode='r')
+		self.indices = numpy.load(os.path.join(path, 'indices.npy'), mmap_mode='r')
+		self.counts = numpy.load(os.path.join(path, 'counts.npy'), mmap_mode='r')
+		self.codes = { column : numpy.load(os.path.join(path, column + '.npy'), mmap_mode='r') for column in METADATA_COLUMNS }
+
+	@staticmethod
+	def write(path, corpusBow):
+		"""Writes a bag of words corpus into a directory (see `BowCorpus`).
+
+		Args:
+			path (str): The path to the corpus directory (created if missing).
+			corpusBow (array of dict): The bag of words corpus.
+		"""
+		os.makedirs(path, exist_ok=True)
+		indptr = numpy.zeros(len(corpusBow) + 1, dtype=numpy.int64)
+		for i, d in enumerate(corpusBow):
+			indptr[i + 1] = indptr[i] + len(d['bow'])
+		indices = numpy.empty(indptr[-1], dtype=numpy.int32)
+		counts = numpy.empty(indptr[-1], dtype=numpy.int32)
+		for i, d in enumerate(corpusBow):
+			if len(d['bow']) > 0:
+				indices[indptr[i]:indptr[i + 1]], counts[indptr[i]:indptr[i + 1]] = zip(*d['bow'])
+		numpy.save(os.path.join(path, 'indptr.npy'), indptr)
+		numpy.save(os.path.join(path, 'indices.npy'), indices)
+		numpy.save(os.path.join(path, 'counts.npy'), counts)
+
+		categories = {}
+		for column in METADATA_COLUMNS:
+			index = {}
+			codes = numpy.fromiter((index.setdefault(d[column], len(index)) for d in corpusBow), dtype=numpy.int32, count=len(corpusBow))
+			numpy.save(os.path.join(path, column + '.npy'), codes)
+			categories[column] = list(index)
+		with open(os.path.join(path, 'meta.json'), 'w+') as f:
+			f.write(json.dumps({ 'num_docs' : len(corpusBow), 'categories' : categories }))
+
+	def __len__(self):
+		return len(self.indptr) - 1
+
+	def bow(self, i):
+		"""Returns the bag of words of a document.
+
+		Args:
+			i (int): The index of the document.
+
+		Returns:
+			(list of tuple): The bag of words (token id, count).
+		"""
+		start, end = self.indptr[i], self.indptr[i + 1]
+		return list(zip(self.indices[start:end].tolist(), self.counts[start:end].tolist()))
+
+	def __getitem__(self, i):
+		d = { column : self.categories[column][self.codes[column][i]] for column in METADATA_COLUMNS }
+		d['bow'] = self.bow(i)
+		return d
+
+	def __iter__(self):
+		for i in range(len(self)):
+			yield self[i]
+
+	def iter_bows(self):
+		"""Yields the bag of words of all documents. The arrays are read in chunks of
+		`chunksize` documents.
+
+		Yields:
+			(list of tuple): The bag of words (token id, count).
+		"""
+		for begin in range(0, len(self), self.chunksize):
+			indptr = self.indptr[begin:begin + self.chunksize + 1].tolist()
+			start = indptr[0]
+			indices = self.indices[start:indptr[-1]].tolist()
+			counts = self.counts[start:indptr[-1]].tolist()
+			for i in range(len(indptr) - 1):
+				yield list(zip(indices[indptr[i] - start:indptr[i + 1] - start], counts[indptr[i] - start:indptr[i + 1] - start]))
+
+class JsonBowCorpus():
+	"""A bag of words corpus in a JSON file (array or JSON Lines) which is read lazily: each
+	iteration streams the documents from disk, so only the documents being processed (e.g. the
+	chunks of gensim) are held in memory. Iterating yields the documents like the JSON corpus.
+	"""
+
+	def __init__(self, path):
+		"""Constructor.
+
+		Args:
+			path (str): The path to the JSON file.
+		"""
+		self.path = path
+		self.length = None
+
+	def __len__(self):
+		# counted by a pass over the file on first use
+		if self.length is None:
+			self.length = sum(1 for _ in self)
+		return self.length
+
+	def __iter__(self):
+		return iter_json_records(self.path)
+
+	def iter_bows(self):
+		"""Yields the bag of words of all documents.
+
+		Yields:
+			(list): The bag of words (token id, count).
+		"""
+		for d in self:
+			yield d['bow']
+
+class BowStream():
+	"""Re-iterable stream of the bag of words of a `BowCorpus` or `JsonBowCorpus` (a gensim corpus).
+	"""
+
+	def __init__(self, corpus):
+		self.corpus = corpus
+
+	def __len__(self):
+		return len(self.corpus)
+
+	def __iter__(self):
+		return self.corpus.iter_bows()
+
+class BowSplit():
+	"""Re-iterable part of a stream of bags of words: every `every`-th document (the held-out
+	documents) or all other documents. The stream is not copied, so it may be read from disk.
+	"""
+
+	def __init__(self, bows, every, held_out):
+		"""Constructor.
+
+		Args:
+			bows (iterable of list): The (sized, re-iterable) bags of words, e.g. of `get_bows`.
+			every (int): Every `every`-th document is held out.
+			held_out (bool): Yields the held-out documents (True) or all others (False).
+		"""
+		self.bows = bows
+		self.every = every
+		self.held_out = held_out
+
+	def __len__(self):
+		num_held_out = (len(self.bows) + self.every - 1) // self.every
+		return num_held_out if self.held_out else len(self.bows) - num_held_out
+
+	def __iter__(self):
+		for i, bow in enumerate(self.bows):
+			if (i % self.every == 0) == self.held_out:
+				yield bow
@@ -1,18 +1,31 @@
-import gensim 
-import json
+import numpy
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
 
-def build_bow_dict(dict, documents, updateDictionary=True):
+from src.data.make_datasets_lda import load_corpus
+from src.features.bow_corpus import write_bow_corpus
+from src.features.hashing_featurizer import HashingFeaturizer, hash_tokens, new_featurizer
+
+def build_bow_dict(dict, documents, updateDictionary=True, n_workers=1, shard_size=10000):
 	"""Transforms each text document in the corpus to a bag of words dictionary.
 
 	Args:
-		dict (gensim.corpora.dictionary.Dictionary): The gensim corpus dictionary.
+		dict (gensim.corpora.dictionary.Dictionary or HashingFeaturizer): The gensim corpus dictionary
+		(or a hashing featurizer with the same interface).
 		documents (array of dict): The corpus of text documents.
 		updateDictionary (bool, optional): Indicates whether the gensim dictionary
 		should be updated, i.e., if missing words should be added (defaults to True).
+		n_workers (int, optional): If greater than 1, the documents are tokenized and counted
+		in shards on worker processes (see `build_bow_dict_sharded`). Defaults to 1.
+		shard_size (int, optional): The number of documents per shard. Defaults to 10000.
 
 	Returns:
 		array of dict: The bag of words corpus.
 	"""
+	if n_workers > 1:
+		if isinstance(dict, HashingFeaturizer):
+			return build_bow_hashed_sharded(dict, documents, updateDictionary, n_workers, shard_size)
+		return build_bow_dict_sharded(dict, documents, updateDictionary, n_workers, shard_size)
 
 	# create dict
 	plainText = [filter(lambda t: len(t.strip()) > 0, d['document'].split(' ')) for d in documents]
@@ -35,17 +48,181 @@ def build_bow_dict(dict, documents, updateDictionary=True):
 
 	return corpusBow
 
+def count_tokens(texts):
+	"""Tokenizes and counts a shard of documents once. Token ids are local to the shard and
+	follow gensim's order (first appearance, new tokens of a document sorted).
+
+	Args:
+		texts (array of str): The texts of the documents of the shard.
+
+	Returns:
+		(dict): The local tokens (`tokens`), their document and collection frequencies (`dfs`,
+		`cfs`), the number of processed words (`num_pos`) and the counts of the documents as
+		CSR arrays (`indptr`, `ids`, `counts`).
+	"""
+	index = {}
+	dfs, cfs = [], []
+	indptr, ids, counts = [0], [], []
+	num_pos = 0
+	for text in texts:
+		counter = {}
+		for t in text.split(' '):
+			if len(t.strip()) > 0:
+				counter[t] = counter.get(t, 0) + 1
+		for t in sorted(t for t in counter if t not in index):
+			index[t] = len(index)
+			dfs.append(0)
+			cfs.append(0)
+		for t, count in counter.items():
+			tokenid = index[t]
+			ids.append(tokenid)
+			counts.append(count)
+			dfs[tokenid] += 1
+			cfs[tokenid] += count
+			num_pos += count
+		indptr.append(len(ids))
+
+	return {
+		"tokens" : list(index),
+		"dfs" : numpy.array(dfs, dtype=numpy.int64),
+		"cfs" : numpy.array(cfs, dtype=numpy.int64),
+		"num_pos" : num_pos,
+		"indptr" : numpy.array(indptr, dtype=numpy.int64),
+		"ids" : numpy.array(ids, dtype=numpy.int64),
+		"counts" : numpy.array(counts, dtype=numpy.int64)
+	}
+
+def build_bow_dict_sharded(dict, documents, updateDictionary=True, n_workers=2, shard_size=10000):
+	"""Sharded version of `build_bow_dict`: worker processes tokenize and count each shard of
+	documents once, the partial dictionaries are merged in shard order (which reproduces the ids
+	of a sequential `add_documents`), `filter_extremes` is applied to the merged dictionary and
+	the bag of words are derived from the counted token ids. Dictionary and corpus equal the ones
+	of `build_bow_dict` (as long as the vocabulary stays below gensim's `prune_at`).
+
+	Args:
+		dict (gensim.corpora.dictionary.Dictionary): The gensim corpus dictionary.
+		documents (array of dict): The corpus of text documents.
+		updateDictionary (bool, optional): Indicates whether the gensim dictionary
+		should be updated, i.e., if missing words should be added (defaults to True).
+		n_workers (int, optional): The number of worker processes. Defaults to 2.
+		shard_size (int, optional): The number of documents per shard. Defaults to 10000.
+
+	Returns:
+		array of dict: The bag of words corpus.
+	"""
+	shards = [[d['document'] for d in documents[i:i + shard_size]] for i in range(0, len(documents), shard_size)]
+	with ProcessPoolExecutor(max_workers=n_workers) as executor:
+		counted = list(executor.map(count_tokens, shards))
+
+	# map the local ids of each shard to the ids of the (merged) dictionary, -1 for unknown tokens
+	token2id = dict.token2id
+	if updateDictionary:
+		for shard in counted:
+			shard['map'] = numpy.fromiter((token2id.setdefault(t, len(token2id)) for t in shard['tokens']), dtype=numpy.int64, count=len(shard['tokens']))
+		dfs = numpy.zeros(len(token2id), dtype=numpy.int64)
+		cfs = numpy.zeros(len(token2id), dtype=numpy.int64)
+		for shard in counted:
+			# local tokens are unique, so their frequencies can be added at once
+			dfs[shard['map']] += shard['dfs']
+			cfs[shard['map']] += shard['cfs']
+			dict.num_docs += len(shard['indptr']) - 1
+			dict.num_pos += shard['num_pos']
+			dict.num_nnz += len(shard['ids'])
+		for tokenid in numpy.flatnonzero(dfs).tolist():
+			dict.dfs[tokenid] = dict.dfs.get(tokenid, 0) + int(dfs[tokenid])
+			dict.cfs[tokenid] = dict.cfs.get(tokenid, 0) + int(cfs[tokenid])
+
+		# filter the merged dictionary and map the merged ids to the final ids
+		merged_token2id = token2id
+		dict.filter_extremes(no_above=0.8)
+		final_ids = numpy.full(len(merged_token2id), -1, dtype=numpy.int64)
+		for token, tokenid in dict.token2id.items():
+			final_ids[merged_token2id[token]] = tokenid
+		for shard in counted:
+			shard['map'] = final_ids[shard['map']]
+	else:
+		for shard in counted:
+			shard['map'] = numpy.fromiter((token2id.get(t, -1) for t in shard['tokens']), dtype=numpy.int64, count=len(shard['tokens']))
+
+	return bows_from_counts(documents, counted)
+
+def build_bow_hashed_sharded(featurizer, documents, updateDictionary=True, n_workers=2, shard_size=10000):
+	"""Sharded version of `build_bow_dict` for a `HashingFeaturizer`: worker processes hash each
+	shard of documents independently (no vocabulary is shared), the bucket statistics are merged
+	and `filter_extremes` is applied to the merged statistics. The bag of words equal the ones of
+	`build_bow_dict` (the sample tokens naming the buckets may differ slightly).
+
+	Args:
+		featurizer (HashingFeaturizer): The hashing featurizer.
+		documents (array of dict): The corpus of text documents.
+		updateDictionary (bool, optional): Indicates whether the statistics of the featurizer
+		should be updated (defaults to True).
+		n_workers (int, optional): The number of worker processes. Defaults to 2.
+		shard_size (int, optional): The number of documents per shard. Defaults to 10000.
+
+	Returns:
+		array of dict: The bag of words corpus.
+	"""
+	shards = [[d['document'] for d in documents[i:i + shard_size]] for i in range(0, len(documents), shard_size)]
+	with ProcessPoolExecutor(max_workers=n_workers) as executor:
+		counted = list(executor.map(partial(hash_tokens, featurizer.num_buckets, featurizer.samples_per_bucket), shards))
+
+	if updateDictionary:
+		for shard in counted:
+			featurizer.merge(shard['num_docs'], shard['dfs'], shard['samples'])
+		featurizer.filter_extremes(no_above=0.8)
+	good_ids = featurizer.good_ids()
+	for shard in counted:
+		shard['map'] = good_ids
+
+	return bows_from_counts(documents, counted)
+
+def bows_from_counts(documents, counted):
+	"""Converts the counts of shards of documents into the bag of words corpus.
+
+	Args:
+		documents (array of dict): The corpus of text documents.
+		counted (array of dict): The counts per shard (CSR arrays `indptr`, `ids` and `counts`) and
+		the mapping of the counted ids to the final ids (`map`, -1 for removed ids).
+
+	Returns:
+		array of dict: The bag of words corpus.
+	"""
+	# sorted by token id, like `doc2bow`
+	corpusBow = []
+	offset = 0
+	for shard in counted:
+		n_docs = len(shard['indptr']) - 1
+		ids = shard['map'][shard['ids']]
+		rows = numpy.repeat(numpy.arange(n_docs), numpy.diff(shard['indptr']))
+		known = ids >= 0
+		ids, counts, rows = ids[known], shard['counts'][known], rows[known]
+		order = numpy.lexsort((ids, rows))
+		ids, counts = ids[order].tolist(), counts[order].tolist()
+		indptr = numpy.concatenate(([0], numpy.cumsum(numpy.bincount(rows, minlength=n_docs)))).tolist()
+		for i, d in enumerate(documents[offset:offset + n_docs]):
+			corpusBow.append({
+				"corpus" : d['corpus'],
+				"type" : d['type'],
+				"emulator" : d['emulator'],
+				"zap-id" : d['zap-id'],
+				"bow" : list(zip(ids[indptr[i]:indptr[i + 1]], counts[indptr[i]:indptr[i + 1]]))
+			})
+		offset += n_docs
+
+	return corpusBow
+
 def main(settings):
+	features = settings.get('features', {})
+
 	# load documents
-	corpus = json.load(open(settings['output']['dir'] + 'processed/' + settings['output']['name'] + '_trainset.json', 'r'))
+	corpus = load_corpus(settings['output']['dir'] + 'processed/' + settings['output']['name'] + '_trainset.json')
 
-	dict = gensim.corpora.Dictionary()
-	corpusBow = build_bow_dict(dict, corpus)
+	dict = new_featurizer(settings)
+	corpusBow = build_bow_dict(dict, corpus, n_workers=features.get('n_workers', 1), shard_size=features.get('shard_size', 10000))
 	dict.save(settings['output']['dir'] + 'temp/' + settings['output']['name'] + '.dict')
 
 	
 
 	# export to file
-	f = open(settings['output']['dir'] + 'temp/' + settings['output']['name'] + '_bow.json', "w+")
-	f.write(json.dumps(corpusBow, sort_keys=False))
-	f.close()
\ No newline at end of file
+	write_bow_corpus(settings, corpusBow)
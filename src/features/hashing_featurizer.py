@@ -0,0 +1,211 @@
+import zlib
+from collections.abc import Mapping
+
+import gensim
+import numpy
+
+class HashingFeaturizer(gensim.utils.SaveLoad, Mapping):
+	"""Bounded-memory alternative to `gensim.corpora.Dictionary`: each token is mapped to one
+	of `num_buckets` ids by its CRC32, so no vocabulary has to be built (and shared) before
+	documents can be converted. Only the document frequencies per bucket and a few sample
+	tokens per bucket are kept: the (approximately) most frequent tokens of the bucket, counted
+	with the space-saving algorithm. The featurizer offers the parts of the `Dictionary` interface
+	used by `build_bow_dict` (`add_documents`, `filter_extremes`, `doc2bow`) and is a mapping of
+	ids to words (the sample tokens of the bucket), so it can be used as `id2word` of gensim models.
+	"""
+
+	def __init__(self, num_buckets=262144, samples_per_bucket=3):
+		"""Constructor.
+
+		Args:
+			num_buckets (int, optional): The number of buckets (ids). Defaults to 262144.
+			samples_per_bucket (int, optional): The number of (frequent) tokens stored per bucket
+			to name it. Defaults to 3.
+		"""
+		self.num_buckets = num_buckets
+		self.samples_per_bucket = samples_per_bucket
+		self.samples = {}
+		self.dfs = numpy.zeros(num_buckets, dtype=numpy.int64)
+		self.num_docs = 0
+		# buckets kept by `filter_extremes`, None if all are kept
+		self.good = None
+
+	def token2bucket(self, token):
+		"""Returns the id of a token.
+
+		Args:
+			token (str): The token.
+
+		Returns:
+			(int): The bucket of the token.
+		"""
+		return zlib.crc32(token.encode('utf-8')) % self.num_buckets
+
+	def add_sample(self, bucket, token, count=1):
+		"""Counts a token of a bucket. If all sample slots of the bucket are taken, the least
+		frequent sample is replaced and its count is inherited (space-saving).
+
+		Args:
+			bucket (int): The bucket of the token.
+			token (str): The token.
+			count (int, optional): The number of occurrences. Defaults to 1.
+		"""
+		samples = self.samples.setdefault(bucket, {})
+		if token in samples:
+			samples[token] += count
+		elif len(samples) < self.samples_per_bucket:
+			samples[token] = count
+		else:
+			least = min(samples, key=samples.get)
+			samples[token] = samples.pop(least) + count
+
+	def add_documents(self, documents):
+		"""Updates the document frequencies and the sample tokens from a collection of documents.
+
+		Args:
+			documents (iterable of iterable of str): The tokenized documents.
+		"""
+		for document in documents:
+			self.doc2bow(document, allow_update=True)
+
+	def doc2bow(self, document, allow_update=False):
+		"""Converts a document into a bag of words (like `Dictionary.doc2bow`). Buckets removed
+		by `filter_extremes` are left out.
+
+		Args:
+			document (iterable of str): The tokenized document.
+			allow_update (bool, optional): Updates the document frequencies and the sample tokens.
+			Defaults to False.
+
+		Returns:
+			(list of tuple): The bag of words (bucket, count), sorted by bucket.
+		"""
+		counter = {}
+		for token in document:
+			bucket = self.token2bucket(token)
+			counter[bucket] = counter.get(bucket, 0) + 1
+			if allow_update:
+				self.add_sample(bucket, token)
+		if allow_update:
+			self.num_docs += 1
+			for bucket in counter:
+				self.dfs[bucket] += 1
+		good = self.good
+		return sorted((bucket, count) for bucket, count in counter.items() if good is None or good[bucket])
+
+	def merge(self, num_docs, dfs, samples):
+		"""Adds the statistics of documents counted elsewhere (e.g. by a worker process).
+
+		Args:
+			num_docs (int): The number of documents.
+			dfs (numpy.ndarray): The document frequencies per bucket.
+			samples (dict): The sample tokens per bucket with their counts.
+		"""
+		self.num_docs += num_docs
+		self.dfs += dfs
+		for bucket, tokens in samples.items():
+			merged = self.samples.setdefault(bucket, {})
+			for token, count in tokens.items():
+				merged[token] = merged.get(token, 0) + count
+			if len(merged) > self.samples_per_bucket:
+				self.samples[bucket] = dict(sorted(merged.items(), key=lambda s: s[1], reverse=True)[:self.samples_per_bucket])
+
+	def filter_extremes(self, no_below=5, no_above=0.5, keep_n=100000):
+		"""Removes buckets by their document frequency, like `Dictionary.filter_extremes`. The ids
+		of the remaining buckets do not change.
+
+		Args:
+			no_below (int, optional): Keep buckets contained in at least `no_below` documents. Defaults to 5.
+			no_above (float, optional): Keep buckets contained in no more than `no_above` documents
+			(fraction of the number of documents). Defaults to 0.5.
+			keep_n (int, optional): Keep only the `keep_n` most frequent buckets (all if None). Defaults to 100000.
+		"""
+		no_above_abs = int(no_above * self.num_docs)
+		good_ids = numpy.flatnonzero((self.dfs >= no_below) & (self.dfs <= no_above_abs))
+		if keep_n is not None and len(good_ids) > keep_n:
+			good_ids = good_ids[numpy.argsort(-self.dfs[good_ids], kind='stable')[:keep_n]]
+		self.good = numpy.zeros(self.num_buckets, dtype=numpy.bool_)
+		self.good[good_ids] = True
+		self.samples = { bucket : tokens for bucket, tokens in self.samples.items() if self.good[bucket] }
+
+	def good_ids(self):
+		"""Returns the ids of the buckets not removed by `filter_extremes`.
+
+		Returns:
+			(numpy.ndarray): The ids per bucket, -1 for removed buckets.
+		"""
+		ids = numpy.arange(self.num_buckets, dtype=numpy.int64)
+		if self.good is not None:
+			ids[~self.good] = -1
+		return ids
+
+	def __getitem__(self, bucket):
+		# gensim looks up ids as numpy integers
+		if not isinstance(bucket, (int, numpy.integer)) or not 0 <= bucket < self.num_buckets:
+			raise KeyError(bucket)
+		samples = self.samples.get(bucket)
+		if not samples:
+			return 'bucket_' + str(bucket)
+		return '|'.join(sorted(samples, key=samples.get, reverse=True))
+
+	def __len__(self):
+		return self.num_buckets
+
+	def __iter__(self):
+		return iter(range(self.num_buckets))
+
+def hash_tokens(num_buckets, samples_per_bucket, texts):
+	"""Converts a shard of documents into bucket counts (executed by worker processes of
+	`build_bow_dict`).
+
+	Args:
+		num_buckets (int): The number of buckets of the featurizer.
+		samples_per_bucket (int): The number of sample tokens per bucket.
+		texts (array of str): The texts of the documents of the shard.
+
+	Returns:
+		(dict): The statistics of the shard (`num_docs`, `dfs`, `samples`) and the counts of the
+		documents as CSR arrays (`indptr`, `ids`, `counts`).
+	"""
+	featurizer = HashingFeaturizer(num_buckets, samples_per_bucket)
+	indptr, ids, counts = [0], [], []
+	for text in texts:
+		for bucket, count in featurizer.doc2bow(filter(lambda t: len(t.strip()) > 0, text.split(' ')), allow_update=True):
+			ids.append(bucket)
+			counts.append(count)
+		indptr.append(len(ids))
+
+	return {
+		"num_docs" : featurizer.num_docs,
+		"dfs" : featurizer.dfs,
+		"samples" : featurizer.samples,
+		"indptr" : numpy.array(indptr, dtype=numpy.int64),
+		"ids" : numpy.array(ids, dtype=numpy.int64),
+		"counts" : numpy.array(counts, dtype=numpy.int64)
+	}
+
+def new_featurizer(settings):
+	"""Creates the featurizer given by `features.featurizer` (`dictionary`: a gensim `Dictionary`,
+	`hashing`: a `HashingFeaturizer` with `features.hash_buckets` buckets).
+
+	Args:
+		settings (dict): The settings object for all kinds of parameters.
+
+	Returns:
+		(gensim.corpora.Dictionary or HashingFeaturizer): The featurizer.
+	"""
+	features = settings.get('features', {})
+	if features.get('featurizer', 'dictionary') == 'hashing':
+		return HashingFeaturizer(features.get('hash_buckets', 262144), features.get('hash_samples', 3))
+	return gensim.corpora.Dictionary()
+
+def load_featurizer(settings):
+	"""Loads the featurizer (dictionary) saved by `build_features_lda`.
+
+	Args:
+		settings (dict): The settings object for all kinds of parameters.
+
+	Returns:
+		(gensim.corpora.Dictionary or HashingFeaturizer): The featurizer.
+	"""
+	return gensim.utils.SaveLoad.load(settings['output']['dir'] + 'temp/' + settings['output']['name'] + '.dict')
@@ -1,6 +1,7 @@
 import os
 
 import numpy as np
+import pandas as pd
 
 import tensorflow as tf
 from tensorflow.keras import layers
@@ -75,6 +76,12 @@ def df_to_dataset(dataframe, label_column, shuffle=True, batch_size=32):
         tf.DataSet: A tensorflow dataset object
     """
     dataframe = dataframe.copy()
+    # tensorflow expects plain strings and floats (structured dataframes use categorical and bool columns)
+    for col in dataframe.columns:
+        if isinstance(dataframe[col].dtype, pd.CategoricalDtype):
+            dataframe[col] = dataframe[col].astype(str)
+        elif pd.api.types.is_bool_dtype(dataframe[col]):
+            dataframe[col] = dataframe[col].astype(np.float32)
     labels = dataframe.pop(label_column)
     ds = tf.data.Dataset.from_tensor_slices((dict(dataframe), labels))
     if shuffle:
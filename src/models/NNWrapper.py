@@ -9,18 +9,29 @@ from sklearn.model_selection import train_test_split
 
 import src.models.NNArchitecture as NNA
 from src.data.BalancedData import BalancedData
+from src.data.DataCache import DataCache
+from src.transformation.HTTPTransformer import HTTPTransformer
 
 
 def eval_wrapper(setting_name, proj_root, train_files, test_files=[], label_column='bin_label', 
-                text_vars=[], categ_vars=[], num_vars=[], bin_vars=[], nn_settings=None):
+                text_vars=[], categ_vars=[], num_vars=[], bin_vars=[], nn_settings=None, cache_dir=None,
+                transform_cache_size=None, max_uri_decode_depth=None):
     print(f"/// New config run: '{setting_name}' ///")
+    # Structured dataframes are cached across runs if a cache directory is given
+    cache = DataCache(cache_dir) if cache_dir is not None else None
+    # Nested URL encodings are decoded up to this depth (None: unbounded)
+    HTTPTransformer.max_uri_decode_depth = max_uri_decode_depth
+    # Repeated URIs and body values are transformed once if memoisation is enabled (the header
+    # caches stay unused here: the structured data only encodes the presence of headers)
+    if transform_cache_size is not None:
+        HTTPTransformer.enable_caching(transform_cache_size)
     # >  Load data
     # |- Train Data
     times = {}
     times['start'] = time.time()
     print("> Loading TRAINING data...")
     train_loader = BalancedData(proj_root=proj_root, file_paths=train_files)
-    train_loader.load_data()
+    train_loader.load_data(cache=cache)
     train_df = train_loader.get_all_data_df()
 
     train_df['bin_label'] = train_df.apply(lambda x: NNA.binarize_label(x), axis=1)
@@ -29,7 +40,7 @@ def eval_wrapper(setting_name, proj_root, train_files, test_files=[], label_colu
     if len(test_files)>0:
         print("> Loading TEST data...")
         test_loader = BalancedData(proj_root=proj_root, file_paths=test_files)
-        test_loader.load_data()
+        test_loader.load_data(cache=cache)
         test_df = test_loader.get_all_data_df()
 
         test_df['bin_label'] = test_df.apply(lambda x: NNA.binarize_label(x), axis=1)
@@ -39,6 +50,11 @@ def eval_wrapper(setting_name, proj_root, train_files, test_files=[], label_colu
         train_df = train_df.copy() # Avoid SettingWithCopy Warning from pandas
         test_df = test_df.copy()
     times['test-data-loaded'] = time.time()
+    for name, stats in HTTPTransformer.cache_stats().items():
+        if stats['hits'] + stats['misses'] == 0:
+            continue
+        print(f"  Transformation cache '{name}': {stats['hits']} hits, {stats['misses']} misses, "
+              f"{stats['evictions']} evictions ({stats['hit_rate']:.1%} cache-served)")
 
     N_CLASSES = len(train_df[label_column].unique())
     print(f"  Found {N_CLASSES} classes to predict.")
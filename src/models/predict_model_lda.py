@@ -3,6 +3,9 @@ import json
 import time
 
 from src.features.build_features_lda import build_bow_dict
+from src.features.bow_corpus import load_bow_corpus
+from src.features.hashing_featurizer import load_featurizer
+from src.data.make_datasets_lda import load_corpus
 
 def transform_topics_for_hellinger(*topics):
 	"""Brings the topic distributions into a format that can be used to compute the
@@ -38,9 +41,9 @@ def load_model(settings):
 	"""
 
 	# load corpus (as bow) and dictionary
-	corpus = json.load(open(settings['output']['dir'] + 'temp/' + settings['output']['name'] + '_bow.json', 'r'))
+	corpus = load_bow_corpus(settings)
 	trainedTopics = json.load(open(settings['output']['dir'] + 'lda_trained/' + settings['output']['name'] + '_trained.json', 'r'))
-	dict = gensim.corpora.Dictionary.load(settings['output']['dir'] + 'temp/' + settings['output']['name'] + '.dict')
+	dict = load_featurizer(settings)
 	model = gensim.models.ldamodel.LdaModel.load( settings['output']['dir'] + 'temp/' + settings['output']['name'] + '.ldamodel' )
 
 	return corpus, model, dict, \
@@ -160,8 +163,9 @@ def main(settings):
 	corpus, model, dict, learnedTopics = load_model(settings)
 
 	# load documents and build bow for test set
-	test_corpus = json.load(open(settings['output']['dir'] + 'processed/' + settings['output']['name'] + '_testset.json', 'r'))
-	test_bow = build_bow_dict(dict, test_corpus, updateDictionary=False)
+	test_corpus = load_corpus(settings['output']['dir'] + 'processed/' + settings['output']['name'] + '_testset.json')
+	features = settings.get('features', {})
+	test_bow = build_bow_dict(dict, test_corpus, updateDictionary=False, n_workers=features.get('n_workers', 1), shard_size=features.get('shard_size', 10000))
 
 	report = eval_corpus(settings, model, test_bow, learnedTopics)
 
@@ -1,45 +1,162 @@
+import copy
 import gensim 
 import json
+import math
+import os
+import time
 
+import numpy
+
+from src.features.bow_corpus import BowSplit, get_bows, load_bow_corpus
+from src.features.hashing_featurizer import load_featurizer
 from src.utils.float_encoder import FloatEncoder 
 
+def available_cores():
+	"""Returns the number of cores this process may run on.
+
+	Returns:
+		(int): The number of cores.
+	"""
+	if hasattr(os, 'sched_getaffinity'):
+		return len(os.sched_getaffinity(0))
+	return os.cpu_count() or 1
+
+def lda_training_params(settings):
+	"""Returns the training parameters of gensim's LdaMulticore given by the `lda` settings
+	(`workers`, `passes`, `chunksize`, `eval_every` and `dtype`). With `workers` = `auto`, all
+	but one of the available cores are used (the main process feeds the workers).
+
+	Args:
+		settings (dict): The settings object for all kinds of parameters.
+
+	Returns:
+		(dict): The parameters.
+	"""
+	workers = settings['lda'].get('workers', 'auto')
+	if workers == 'auto':
+		workers = max(1, available_cores() - 1)
+
+	return {
+		'workers' : workers,
+		'passes' : settings['lda'].get('passes', 2),
+		'chunksize' : settings['lda'].get('chunksize', 2000),
+		'eval_every' : settings['lda'].get('eval_every', 10),
+		'dtype' : getattr(numpy, settings['lda'].get('dtype', 'float32'))
+	}
+
+def train_with_early_stopping(settings, bow, model_args, passes):
+	"""Trains the LDA model pass by pass on all but the held-out documents (every n-th document
+	with n = round(1 / `lda.early_stopping.holdout`)) until the perplexity of the held-out documents
+	has not improved by more than `min_delta` for `patience` passes, or `passes` passes are done.
+	The model of the pass with the lowest held-out perplexity is returned (the last one if no
+	pass had a finite held-out perplexity).
+
+	Args:
+		settings (dict): The settings object for all kinds of parameters.
+		bow (iterable of list): The bag of words of all documents.
+		model_args (dict): The parameters of LdaMulticore (without `corpus` and `passes`).
+		passes (int): The maximal number of passes.
+
+	Raises:
+		ValueError: If `holdout` is not in (0, 0.5].
+
+	Returns:
+		(gensim.models.LdaMulticore, dict): The learned LDA model and the training log (time
+		and held-out perplexity per pass, the kept pass).
+	"""
+	early_stopping = settings['lda']['early_stopping']
+	holdout = early_stopping.get('holdout', 0.1)
+	if not 0 < holdout <= 0.5:
+		raise ValueError(f"lda.early_stopping.holdout must be in (0, 0.5], got {holdout}.")
+	every = round(1 / holdout)
+	patience = early_stopping.get('patience', 1)
+	min_delta = early_stopping.get('min_delta', 0)
+
+	train_bow, holdout_bow = BowSplit(bow, every, False), BowSplit(bow, every, True)
+	model = gensim.models.LdaMulticore(corpus=None, passes=1, **model_args)
+
+	log = { 'holdout_documents' : len(holdout_bow), 'passes_done' : 0, 'seconds' : 0, 'passes' : [], 'stopped_early' : False, 'kept_pass' : None }
+	best, best_state, without_improvement = float('inf'), None, 0
+	for p in range(passes):
+		start = time.time()
+		model.update(train_bow)
+		seconds = time.time() - start
+		perplexity = -1 * model.log_perplexity(holdout_bow)
+		log['passes'].append({ 'pass' : p + 1, 'seconds' : seconds, 'holdout_perplexity' : perplexity })
+		log['passes_done'] += 1
+		log['seconds'] += seconds
+		print("LDA pass", p + 1, "- seconds:", seconds, "; held-out perplexity:", perplexity)
+
+		if math.isfinite(perplexity) and perplexity < best - min_delta:
+			best, without_improvement = perplexity, 0
+			best_state, log['kept_pass'] = copy.deepcopy(model.state), p + 1
+		else:
+			without_improvement += 1
+			if without_improvement >= patience:
+				log['stopped_early'] = True
+				break
+
+	if log['kept_pass'] is None:
+		# no finite held-out perplexity, nothing to compare
+		print("LDA held-out perplexity was never finite, keeping the model of the last pass")
+		log['kept_pass'] = log['passes_done']
+	# restore the best pass (the later passes did not improve by more than `min_delta`)
+	elif log['kept_pass'] != log['passes_done']:
+		model.state = best_state
+		model.sync_state()
+		print("LDA keeps the model of pass", log['kept_pass'])
+
+	return model, log
+
 def learn_lda_model(settings):
-	"""Learns the LDA model.
+	"""Learns the LDA model. The training parameters are given by `lda_training_params`,
+	with `lda.early_stopping` the model is trained until the held-out perplexity stops
+	improving (see `train_with_early_stopping`).
 
 	Args:
 		settings (dict): The settings object for all kinds of parameters (including
 		the hyperparameters for the LDA model).
 
 	Returns:
-		(numpy.ndarray, array of dict): The learned LDA model and the bag of words corpus.
+		(numpy.ndarray, array of dict, dict): The learned LDA model, the bag of words corpus
+		and the training log (parameters, time and perplexity per pass).
 	"""
 
 	# load corpus (as bow) and dictionary
-	corpus = json.load(open(settings['output']['dir'] + 'temp/' + settings['output']['name'] + '_bow.json', 'r'))
-	dict = gensim.corpora.Dictionary.load(settings['output']['dir'] + 'temp/' + settings['output']['name'] + '.dict')
-
-	# prepare bag of words
-	bow = [d['bow'] for d in corpus]
+	corpus = load_bow_corpus(settings)
+	dict = load_featurizer(settings)
+
+	# prepare bag of words (streamed from disk for binary corpora and with `lda.stream_corpus`,
+	#	gensim then holds only a few chunks of `lda.chunksize` documents in memory)
+	bow = get_bows(corpus)
+
+	params = lda_training_params(settings)
+	passes = params.pop('passes')
+	model_args = {
+		'num_topics' : settings['lda']['topics'],
+		'id2word' : dict,
+		'per_word_topics' : True,
+		'alpha' : settings['lda']['alpha'],
+		'eta' : settings['lda']['beta'],
+		'minimum_phi_value' : settings['lda']['min_phi_value'],
+		'iterations' : settings['lda']['max_iteration'],
+		'minimum_probability' : settings['lda']['min_probability'],
+		'gamma_threshold' : settings['lda']['gamma_threshold'],
+		**params
+	}
 
 	# learn model
-	model = gensim.models.LdaMulticore(
-		corpus=bow,
-		num_topics=settings['lda']['topics'],
-		id2word=dict,
-		passes=2,
-		workers=6,
-		per_word_topics=True,
-		alpha=settings['lda']['alpha'],
-		eta=settings['lda']['beta'],
-		minimum_phi_value=settings['lda']['min_phi_value'],
-		iterations=settings['lda']['max_iteration'],
-		minimum_probability=settings['lda']['min_probability'],
-		gamma_threshold=settings['lda']['gamma_threshold']
-	)
+	if settings['lda'].get('early_stopping') is not None:
+		model, log = train_with_early_stopping(settings, bow, model_args, passes)
+	else:
+		start = time.time()
+		model = gensim.models.LdaMulticore(corpus=bow, passes=passes, **model_args)
+		log = { 'passes_done' : passes, 'seconds' : time.time() - start }
+	log.update(workers=params['workers'], chunksize=params['chunksize'], dtype=params['dtype'].__name__)
 
 	model.save(settings['output']['dir'] + 'temp/' + settings['output']['name'] + '.ldamodel')
 
-	return model, corpus
+	return model, corpus, log
 
 '''
 	SUPERVISED TOPIC to Attack Type/ Emulator mapping
@@ -67,7 +184,7 @@ def model_stats(settings, model, corpus):
 			topics[topic[0]][word] = prob
 
 	# model perplexity
-	perplexity = -1 * model.log_perplexity([d['bow'] for d in corpus])
+	perplexity = -1 * model.log_perplexity(get_bows(corpus))
 
 	return topics, perplexity
 
@@ -156,7 +273,7 @@ def get_topics_for_class(settings, model, corpus, class_type, single_value_class
 
 def main(settings):
 	# generate/ load model
-	model, corpus = learn_lda_model(settings)
+	model, corpus, training = learn_lda_model(settings)
 
 	# collect stats
 	topic, perplexity = model_stats(settings, model, corpus)
@@ -165,6 +282,7 @@ def main(settings):
 	result = {
 		'topic' : topic, # each topic by most probable words
 		'perplexity' : perplexity,
+		'training' : training, # training parameters, time (and held-out perplexity) per pass
 		'requestTopics' : {
 			'emulators' : get_topics_for_class(settings, model, corpus, 'emulator', single_value_class=False), # the topics per used emulator (none, rfi, ...)
 			'types' : get_topics_for_class(settings, model, corpus, 'type'), # the topics per type (benign, attack)
@@ -0,0 +1,180 @@
+import datetime
+import ipaddress
+import re
+import sys
+import time
+
+from src.transformation.RequestTextExtractor import RequestTextExtractor
+from src.transformation.ValueCategories import value_categories_to_text
+from src.utils.json_stream import iter_json_records
+from src.utils.string_utils import nested_unquote
+
+# Measures the request-to-text conversion of the LDA corpus: the original implementation with
+# the settings evaluated per call (`baseline_text_from_request`) vs. compiled once
+# (`RequestTextExtractor`, which `getTextFromRequest` wraps now), e.g.
+# `python -m src.scripts.benchmark_request_text [dataset] [repetitions]`.
+
+def baseline_text_from_request(request, settings):
+	"""Converts a JSON request into text: copy of `getTextFromRequest` before the
+	`RequestTextExtractor` (settings evaluated per call), kept as baseline of the benchmark.
+
+	Args:
+		request (dict): The JSON request to transform into text.
+		settings (dict): The settings object for all kinds of parameters.
+
+	Returns:
+		str: The transformed request.
+	"""
+	def headerToText(header, isRequest=False, isResponse=False):
+		"""Converts a HTTP header into a list of words. Several value parameters are transformed:
+		- Version numbers are deleted or replaced by the string 'version'
+		- For dates, minutes and seconds are removed
+		- And others (see code).
+
+		Args:
+			header (dict): HTTP header as dict (representing the key-value pairs)
+			isRequest (bool, optional): Flag for request header. Defaults to False.
+			isResponse (bool, optional): Flag for response header. Defaults to False.
+
+		Returns:
+			list: A list of words generated from the header.
+		"""
+		t = []
+
+		if isRequest:
+			typePrefix = "request"
+		elif isResponse:
+			typePrefix = "response"
+		else:
+			typePrefix = ""			
+
+		for key,value in header.items():
+			key_low = key.lower()
+			if key_low == 'cookie':
+				t.append(paramsToText(value, prefix=typePrefix + '_cookie', delimiter=';'))
+			elif key_low != 'x-zap-scan-id': # nothing to do for 'x-zap-scan-id' (internal zap flag for later classification)
+				
+				if key_low not in ['accept', 'accept-encoding', 'accept-language', 'cache-control', 'connection', 'content-length', 'content-type', 'referer']:
+					t.append( typePrefix + '_header_' + key_low)
+			
+				if key_low in ['date', 'expires', 'last-modified', 'if-modified-since', 'if-unmodified-since']:
+					if settings['corpus']['use_times']:
+						t.append( re.sub(r':\d\d:\d\d', '', value).replace(' ', '') )
+				elif key_low in ['x-powered-by', 'server', 'user-agent']: 
+					t.append( re.sub(r'(\d+(.|_))*\d+', 'version', value).replace(' ', '') )
+				#elif key_low in ['accept', 'accept-language']: 
+				#	t.append( re.sub(r';?q=[\d.]+', '', value).replace(' ', '') )
+				elif key_low in ['accept', 'accept-encoding', 'accept-language', 'connection', 'referer']:
+					pass
+				else:
+					t.append( re.sub(r'[^a-zA-Z0-9]', '', value) )
+		return t
+
+	def bodyToText(body):
+		"""Converts the body of a HTTP post request into a string of words. The
+		words represent the relevant classes of characters which appear in the value,
+		e.g. value_alphanum for alphanumerical characters (for the complete list,
+		see `VALUE_CATEGORIES` in `src.transformation.ValueCategories`). Example: `key=123` becomes
+		`post_key value_alphanum value_onlyText value_short_string value_num value_onlyNum`.
+
+		Args:
+			body (dict): HTTP body key-value pairs.
+
+		Returns:
+			str: transformed body.
+		"""
+		t = ""
+		for name, value in body.items():
+			if t != "":
+				t += " "
+
+			t += "post_" + name + value_categories_to_text(value)
+		return t
+
+	def paramsToText(params, prefix='get', delimiter='&'):
+		"""Converts url parameters into a string of words. The words represent the
+		relevant classes of characters which appear in the values of the key-value
+		pairs. This is analogous to the `bodyToText` function.
+
+		Args:
+			params (str): The url parameters to transform.
+			prefix (str, optional): Prefix specifying the request type. Defaults to 'get'.
+			delimiter (str, optional): The delimiter at which the parameters are split. Defaults to '&'.
+
+		Returns:
+			str: transformed url parameters.
+		"""
+		t = ""
+		for param in params.split(delimiter):
+			if t != "":
+				t += " "
+
+			parts = param.split('=')
+			if len(parts) > 1:
+				name, value = parts[0], parts[1]
+
+				# (nested) url decode
+				value = nested_unquote(value, max_depth=settings['corpus'].get('max_uri_decode_depth'))[0]
+
+				t += prefix + "_" + name + value_categories_to_text(value)
+			else:
+				t += prefix + "_" + param
+
+		return t
+
+	text = []
+	text.extend(headerToText(request['header'], isRequest=True))
+	text.extend(headerToText(request['honeypot']['response-header'], isResponse=True))
+	if settings['corpus']['use_times']:
+		text.append(datetime.datetime.fromtimestamp(request['timestamp']).fromtimestamp(request['timestamp']).strftime("request_day_%a request_hour_%H request_minute_%M"))
+	text.append('request_method_' + request['request']['method'] + ' request_protocol_' + request['request']['protocol'])
+	text.append(request['honeypot']['response-hash'] + " response_size_" + str(request['honeypot']['response-size'])
+		+ " response_status_" + str(request['honeypot']['response-status-code']) )
+
+	# url as two parts => path to file and get params
+	if '?' in request['request']['uri']:
+		filepart = request['request']['uri'][0:request['request']['uri'].find('?')]
+		text.append(paramsToText(request['request']['uri'][request['request']['uri'].find('?')+1:]))
+	else:
+		filepart = request['request']['uri']
+	
+	path_string = 'path_'
+	text.append( path_string )
+	for path in filepart.split('/'):
+		if path != "":
+			path_string += 'file_' if '.' in path else 'folder_'
+			text.append( path_string )
+
+	if request['request']['method'] == "POST":
+		text.append(bodyToText(request['request']['body']))
+
+	ip_object = ipaddress.ip_address(request['sender']['ip'])
+	text.append( ("private_ip " if ip_object.is_private else "" )
+			+ ( "global_ip " if ip_object.is_global else "" )
+			+ ( "reserved_ip" if ip_object.is_reserved else "" ) )
+
+	return ' '.join(text).lower()
+
+file_path = sys.argv[1] if len(sys.argv) > 1 else "data/raw/example_zap.json"
+repetitions = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+
+requests = list(iter_json_records(file_path))
+print(f"{len(requests)} requests x {repetitions} repetitions")
+print(f"{'use_times':<12}{'baseline (us)':>16}{'compiled (us)':>16}{'speedup':>10}")
+for use_times in [True, False]:
+	settings = { 'corpus' : { 'use_times' : use_times } }
+	extractor = RequestTextExtractor.from_settings(settings)
+
+	start = time.perf_counter()
+	for _ in range(repetitions):
+		baseline = [baseline_text_from_request(r, settings) for r in requests]
+	baseline_seconds = time.perf_counter() - start
+
+	start = time.perf_counter()
+	for _ in range(repetitions):
+		compiled = [extractor(r) for r in requests]
+	compiled_seconds = time.perf_counter() - start
+
+	assert baseline == compiled
+	n = len(requests) * repetitions
+	print(f"{str(use_times):<12}{baseline_seconds / n * 1e6:>16.1f}{compiled_seconds / n * 1e6:>16.1f}{baseline_seconds / compiled_seconds:>10.2f}")
@@ -0,0 +1,22 @@
+import sys
+import timeit
+
+from src.transformation.HTTPTransformer import HTTPTransformer
+
+# Measures the latency of the URI transformation (path tokenizer and query masking) per URI,
+# e.g. `python -m src.scripts.benchmark_uri_tokenizer [repetitions]`.
+repetitions = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+
+uris = {
+	'short path' : "/index.php",
+	'short query' : "/products.php?id=42&sort=price&q=red+shoes",
+	'injection' : "/search.php?q=1%27%20UNION%20SELECT%20null%2Cversion()%20--%20&page=2",
+	'traversal 10KB' : "/static/" + "../" * 3400 + "etc/passwd",
+	'query 10KB' : "/search.php?q=" + "%27%29%3B" * 1200 + "&id=" + "1" * 1000,
+	'mixed 100KB' : "/a.php?x=" + "aB1_.-/ <>" * 10000
+}
+
+print(f"{'URI':<16}{'length':>10}{'latency (us)':>16}")
+for name, uri in uris.items():
+	seconds = timeit.timeit(lambda: HTTPTransformer.uri_transformation_wrapper(uri), number=repetitions)
+	print(f"{name:<16}{len(uri):>10}{seconds / repetitions * 1e6:>16.1f}")
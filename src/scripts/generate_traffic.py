@@ -0,0 +1,23 @@
+import sys
+import json
+
+from src.data.TrafficGenerator import SyntheticTrafficGenerator
+
+# Generates a synthetic honeypot capture for load tests and benchmarks, e.g.
+# `python -m src.scripts.generate_traffic settings.json` with settings like
+# {"proj_root": ".", "output": "data/raw/synthetic.jsonl", "n_requests": 1000000,
+#  "connection_length": 3, "attack_mix": {"40018": 2, "40012": 1}, "attack_ratio": 0.5,
+#  "seed": 0, "n_workers": 4}
+settings = json.load(open(sys.argv[1], 'r'))
+
+generator = SyntheticTrafficGenerator(
+	settings.get('proj_root', '.'),
+	settings['n_requests'],
+	connection_length=settings.get('connection_length', 3),
+	attack_mix=settings.get('attack_mix'),
+	attack_ratio=settings.get('attack_ratio', 0.5),
+	seed=settings.get('seed', 0),
+	shard_size=settings.get('shard_size', 100000)
+)
+generator.write(settings['output'], json_lines=settings.get('json_lines'), n_workers=settings.get('n_workers', 1))
+print(f"Wrote {settings['n_requests']} requests to {settings['output']}")
@@ -1,4 +1,5 @@
 import numpy as np
+from scipy import sparse
 
 # From https://github.com/Narengowda/http_headers/blob/master/headers.py
 # and https://www.iana.org/assignments/message-headers/message-headers.xhtml
@@ -311,7 +312,154 @@ HTTP_RELEVANT_HEADERS = ['Accept', 'Accept-Encoding', 'Accept-Language', 'Cache-
        'Origin', 'Referer', 'User-Agent']
 
 def transform_header_dict(header_dict, headers=HTTP_HEADERS_LIST):
-    out = {}
-    for header in headers:
-        out[header] = 1.0 if header in header_dict else 0.0
-    return out
+    """Encodes the presence of headers as floats (1.0 if present, 0.0 otherwise). Header names
+    are compared case-sensitively; only the headers present in `header_dict` are looked up.
+    The shared encoder is looked up by the header names on every call, so for many requests
+    use `get_header_encoder` once and call its `encode`.
+
+    Args:
+        header_dict (dict): HTTP header
+        headers (list of str, optional): headers to encode. Defaults to HTTP_HEADERS_LIST.
+
+    Returns:
+        dict: presence per header
+    """
+    return get_header_encoder(headers, case_sensitive=True).encode(header_dict)
+
+
+class HeaderEncoder():
+    """Encodes the presence of HTTP headers. A name-to-column table is precomputed, so encoding
+    a request only costs a lookup per header present in it, no matter how many headers are
+    encoded (e.g., the 300 names of `HTTP_HEADERS_LIST`).
+    """
+
+    def __init__(self, headers=HTTP_HEADERS_LIST, case_sensitive=False):
+        """Constructor.
+
+        Args:
+            headers (list of str, optional): headers to encode (one column each). Defaults to HTTP_HEADERS_LIST.
+            case_sensitive (bool, optional): compare header names case-sensitively. Defaults to False
+                (HTTP header names are case-insensitive).
+        """
+        self.headers = list(headers)
+        self.case_sensitive = case_sensitive
+        self.index = {}
+        for column, name in enumerate(self.headers):
+            self.index.setdefault(self._normalize(name), []).append(column)
+
+    def _normalize(self, name):
+        return name if self.case_sensitive else name.lower()
+
+    def indices(self, header):
+        """Columns of the headers present in a request.
+
+        Args:
+            header (dict): HTTP header
+
+        Returns:
+            list of int: sorted column indices (without duplicates)
+        """
+        index = self.index
+        columns = []
+        for name in header:
+            found = index.get(name if self.case_sensitive else name.lower())
+            if found is not None:
+                columns.extend(found)
+        if len(columns) > 1:
+            columns = sorted(set(columns))
+        return columns
+
+    def encode(self, header):
+        """Encodes a single request like `transform_header_dict`.
+
+        Args:
+            header (dict): HTTP header
+
+        Returns:
+            dict: presence per header (1.0 or 0.0)
+        """
+        out = dict.fromkeys(self.headers, 0.0)
+        headers = self.headers
+        index = self.index
+        for name in header:
+            found = index.get(name if self.case_sensitive else name.lower())
+            if found is not None:
+                for column in found:
+                    out[headers[column]] = 1.0
+        return out
+
+    def encode_batch(self, headers, output='bool'):
+        """Encodes the headers of many requests into a matrix (one row per request, one column
+        per header), without creating a dict per request.
+
+        Args:
+            headers (iterable of dict): HTTP headers
+            output (str, optional): `bool` for a dense bool matrix, `packed` for a uint8 matrix with
+                8 columns per byte (see `np.unpackbits`) or `sparse` for a scipy CSR matrix
+                (uint8). Defaults to 'bool'.
+
+        Raises:
+            ValueError: for an unknown `output`
+
+        Returns:
+            np.ndarray or scipy.sparse.csr_matrix: presence matrix
+        """
+        indptr = [0]
+        indices = []
+        for header in headers:
+            indices.extend(self.indices(header))
+            indptr.append(len(indices))
+        return self.to_matrix(indptr, indices, output=output)
+
+    def to_matrix(self, indptr, indices, output='bool'):
+        """Creates the presence matrix from the columns of the present headers per request in
+        CSR layout (the columns of request `i` are `indices[indptr[i]:indptr[i + 1]]`).
+
+        Args:
+            indptr (sequence of int): row pointers (length: number of requests + 1)
+            indices (sequence of int): columns of the present headers
+            output (str, optional): `bool`, `packed` or `sparse`, see `encode_batch`. Defaults to 'bool'.
+
+        Raises:
+            ValueError: for an unknown `output`
+
+        Returns:
+            np.ndarray or scipy.sparse.csr_matrix: presence matrix
+        """
+        indptr = np.asarray(indptr, dtype=np.int64)
+        indices = np.asarray(indices, dtype=np.int64)
+        n_rows, n_columns = len(indptr) - 1, len(self.headers)
+        rows = np.repeat(np.arange(n_rows), np.diff(indptr))
+
+        if output == 'sparse':
+            data = np.ones(len(indices), dtype=np.uint8)
+            return sparse.csr_matrix((data, indices, indptr), shape=(n_rows, n_columns))
+        if output == 'bool':
+            matrix = np.zeros((n_rows, n_columns), dtype=np.bool_)
+            matrix[rows, indices] = True
+            return matrix
+        if output == 'packed':
+            matrix = np.zeros((n_rows, (n_columns + 7) // 8), dtype=np.uint8)
+            np.bitwise_or.at(matrix, (rows, indices >> 3), (0x80 >> (indices & 7)).astype(np.uint8))
+            return matrix
+        raise ValueError(f"Unknown output '{output}', use one of ['bool', 'packed', 'sparse'].")
+
+
+_ENCODERS = {}
+
+def get_header_encoder(headers=HTTP_HEADERS_LIST, case_sensitive=False):
+    """Returns a (shared) encoder for a header list, so its table is only built once per
+    distinct list of header names (keyed by the names, not by the list object).
+
+    Args:
+        headers (list of str, optional): headers to encode. Defaults to HTTP_HEADERS_LIST.
+        case_sensitive (bool, optional): compare header names case-sensitively. Defaults to False.
+
+    Returns:
+        HeaderEncoder: encoder
+    """
+    key = (tuple(headers), case_sensitive)
+    encoder = _ENCODERS.get(key)
+    if encoder is None:
+        encoder = _ENCODERS[key] = HeaderEncoder(list(key[0]), case_sensitive=case_sensitive)
+    return encoder
@@ -1,21 +1,106 @@
 # coding: utf-8
 from urllib.parse import unquote, urlsplit
-from datetime import datetime
 import re
 import os
-from copy import deepcopy
 from string import punctuation
 
-from ipaddress import ip_address
+from collections.abc import Mapping
 
+import pandas as pd
+
+from src.data.RequestRecord import RequestRecord
 from src.transformation.DataTransformer import DataTransformer
+from src.transformation.RequestTextExtractor import RequestTextExtractor
+from src.transformation.TransformCache import TransformCache
+from src.transformation.ValueCategories import VALUE_CATEGORIES, mask_category, value_categories_to_text
 import src.utils.list_utils as list_utils
-from src.utils.list_utils import list_flatten
 import src.utils.string_utils as string_utils
+from src.utils.batch_utils import factorize_values, map_distinct, map_values, take_results
+
+
+# Tokens of paths and query parameters in a single pass: either a run of the same non-word
+# char (group 1 is set) or a run of word chars / whitespace.
+_TOKEN_REGEX = re.compile(r'([^\w\s])\1*|[\w\s]+')
 
 
 class HTTPTransformer(DataTransformer):
 
+    # Character class categories of values, see `ValueCategories.value_categories`.
+    regex_categories = VALUE_CATEGORIES
+
+    # Maximum number of nested URL encodings decoded in `uri_transformation_wrapper`
+    # (None: decode until the URI does not change anymore)
+    max_uri_decode_depth = None
+
+    # Compiled `RequestTextExtractor` of `request_to_text_wrapper` (created on first use)
+    text_extractor = None
+
+    # Opt-in memoisation of the transformations per raw input (see `enable_caching`)
+    caches = None
+    cache_size = None
+    CACHED_TRANSFORMATIONS = ['uri', 'header', 'header_words', 'body_value']
+
+    @classmethod
+    def transformation_settings(cls):
+        """The class-level settings of the transformations (`max_uri_decode_depth` and the size of
+        the memoisation, None if disabled). Worker processes only inherit them when they are
+        forked, so pools pass them on with `apply_transformation_settings` as initializer.
+
+        Returns:
+            dict: settings
+        """
+        return {'max_uri_decode_depth': cls.max_uri_decode_depth, 'cache_size': cls.cache_size}
+
+    @classmethod
+    def apply_transformation_settings(cls, settings):
+        """Applies settings created by `transformation_settings` (e.g., in a worker process).
+        Caches that already have the given size are kept.
+
+        Args:
+            settings (dict): settings
+        """
+        cls.max_uri_decode_depth = settings['max_uri_decode_depth']
+        if settings['cache_size'] is None:
+            cls.disable_caching()
+        elif cls.caches is None or cls.cache_size != settings['cache_size']:
+            cls.enable_caching(settings['cache_size'])
+
+    @classmethod
+    def enable_caching(cls, max_size=100000):
+        """Memoises the transformation of URIs (`uri_transformation_wrapper`, `transform_uris`),
+        header fields (`transform_header`, `header_to_string_list`) and body values (`handle_body`),
+        keyed by the raw input. Scanner traffic repeats the same inputs over and over.
+
+        The structured dataframes (`StructuredFrameBuilder`) only use the `uri` and `body_value`
+        caches: header fields are not transformed there, only the presence of headers is encoded.
+        Body values transformed on worker processes (`handle_bodies` with `n_workers` > 1) are
+        memoised per worker, so they do not show up in `cache_stats`.
+
+        Args:
+            max_size (int, optional): maximum number of cached results per transformation
+                (least recently used ones are evicted). Defaults to 100000.
+        """
+        cls.caches = {name: TransformCache(max_size) for name in cls.CACHED_TRANSFORMATIONS}
+        cls.cache_size = max_size
+
+    @classmethod
+    def disable_caching(cls):
+        """Disables (and drops) the memoisation.
+        """
+        cls.caches = None
+        cls.cache_size = None
+
+    @classmethod
+    def cache_stats(cls):
+        """Counters (hits, misses, evictions, ...) per cached transformation.
+
+        Returns:
+            dict: stats per transformation, empty if caching is disabled
+        """
+        if cls.caches is None:
+            return {}
+        return {name: cache.stats() for name, cache in cls.caches.items()}
+
     @staticmethod
     def uri_transformation_wrapper(uri):
         """Wraps the transformation / cleansing steps for a URI string
@@ -26,14 +111,106 @@ class HTTPTransformer(DataTransformer):
         Returns:
             dict: URI Object
         """
+        if HTTPTransformer.caches is not None:
+            # the result depends on the decode depth, so it is part of the key
+            key = (HTTPTransformer.max_uri_decode_depth, uri)
+            return dict(HTTPTransformer.caches['uri'].get(key, HTTPTransformer._transform_uri_key))
+        return HTTPTransformer._transform_uri(uri)
+
+    @staticmethod
+    def transform_uris(uris, n_workers=1, chunk_size=10000):
+        """Batch version of `uri_transformation_wrapper`: every distinct URI is transformed once
+        (optionally in chunks on worker processes) and the components are assembled per column.
+        The results are identical to the scalar transformation. With caching enabled, the
+        distinct URIs are looked up in the `uri` cache first and only the missing ones are transformed.
+
+        Args:
+            uris (pd.Series or list of str): URI strings
+            n_workers (int, optional): number of worker processes. Defaults to 1.
+            chunk_size (int, optional): number of distinct URIs per chunk sent to a worker. Defaults to 10000.
+
+        Returns:
+            pd.DataFrame: URI objects, one column per component (`scheme`, `netloc`, `path`, `query`,
+                `fragment`, `decode-depth`)
+        """
+        codes, distinct = factorize_values(uris)
+        worker_settings = (HTTPTransformer.transformation_settings(),)
+        if HTTPTransformer.caches is None:
+            objs = map_values(HTTPTransformer._transform_uri, distinct, n_workers=n_workers, chunk_size=chunk_size,
+                              initializer=HTTPTransformer.apply_transformation_settings, initargs=worker_settings)
+        else:
+            cache = HTTPTransformer.caches['uri']
+            depth = HTTPTransformer.max_uri_decode_depth
+            missing = [uri for uri in distinct if (depth, uri) not in cache]
+            transformed = dict(zip(missing, map_values(HTTPTransformer._transform_uri, missing,
+                                                       n_workers=n_workers, chunk_size=chunk_size,
+                                                       initializer=HTTPTransformer.apply_transformation_settings,
+                                                       initargs=worker_settings)))
+            # URIs evicted in between are transformed again
+            objs = [cache.get((depth, uri), lambda key: transformed[key[1]] if key[1] in transformed
+                              else HTTPTransformer._transform_uri_key(key))
+                    for uri in distinct]
+        columns = {}
+        for component in ['scheme', 'netloc', 'path', 'query', 'fragment', 'decode-depth']:
+            columns[component] = take_results([obj[component] for obj in objs], codes)
+        return pd.DataFrame(columns, index=uris.index if isinstance(uris, pd.Series) else None)
+
+    @staticmethod
+    def handle_bodies(bodies, n_workers=1, chunk_size=10000):
+        """Batch version of `handle_body`: every distinct body is transformed once. Empty bodies
+        (`""`) are transformed into empty strings.
+
+        Args:
+            bodies (pd.Series or list): bodies (dicts of key-value pairs or `""`)
+            n_workers (int, optional): number of worker processes. Defaults to 1.
+            chunk_size (int, optional): number of distinct bodies per chunk sent to a worker. Defaults to 10000.
+
+        Returns:
+            pd.Series: transformed bodies
+        """
+        results = map_distinct(HTTPTransformer._handle_body_or_empty, bodies, key=_items_key,
+                               n_workers=n_workers, chunk_size=chunk_size,
+                               initializer=HTTPTransformer.apply_transformation_settings,
+                               initargs=(HTTPTransformer.transformation_settings(),))
+        return pd.Series(results, index=bodies.index if isinstance(bodies, pd.Series) else None, dtype=object)
+
+    @staticmethod
+    def transform_headers(headers, n_workers=1, chunk_size=10000):
+        """Batch version of `transform_header`: every distinct header is transformed once.
+
+        Args:
+            headers (pd.Series or list of dict): headers
+            n_workers (int, optional): number of worker processes. Defaults to 1.
+            chunk_size (int, optional): number of distinct headers per chunk sent to a worker. Defaults to 10000.
+
+        Returns:
+            pd.Series: transformed headers (separate dicts per request)
+        """
+        results = map_distinct(HTTPTransformer.transform_header, headers, key=_items_key,
+                               n_workers=n_workers, chunk_size=chunk_size,
+                               initializer=HTTPTransformer.apply_transformation_settings,
+                               initargs=(HTTPTransformer.transformation_settings(),))
+        results = [{key: list(value) if isinstance(value, list) else value for key, value in h.items()} for h in results]
+        return pd.Series(results, index=headers.index if isinstance(headers, pd.Series) else None, dtype=object)
+
+    @staticmethod
+    def _transform_uri_key(key):
+        # cache keys of URIs are (decode depth, URI)
+        return HTTPTransformer._transform_uri(key[1])
+
+    @staticmethod
+    def _transform_uri(uri):
         # Split into netloc, path, query, fragment
-        uri = HTTPTransformer.nested_uri_decode(uri)
+        uri, depth = HTTPTransformer.nested_uri_decode(uri, max_depth=HTTPTransformer.max_uri_decode_depth, return_depth=True)
 
-        obj = HTTPTransformer.split_uri_into_components(uri)
+        # the URI is decoded already, no need to unquote it again
+        obj = HTTPTransformer.split_uri_into_components(uri, unquote_uri=False)
         obj['netloc'] = obj['netloc']
         obj['path'] = HTTPTransformer.handle_path(obj['path'])
         obj['query'] = HTTPTransformer.handle_query(obj['query'])
         obj['fragment'] = obj['fragment']
+        # nesting depth of the URL encoding (e.g., 2 for double encoding)
+        obj['decode-depth'] = depth
 
         return obj
 
@@ -50,24 +227,28 @@ class HTTPTransformer(DataTransformer):
         Returns:
             str: transformed path
         """
-        reg = r'([^\w\s]+)'
-        l = re.split(reg, path)
-
-        # Handle extension (if existent)
+        tokens = []
+        run_start = 0
+        last_is_punct = None
+        for match in _TOKEN_REGEX.finditer(path):
+            is_punct = match.group(1) is not None
+            if is_punct is not last_is_punct or not is_punct:
+                # remember where the last group of non-word chars / string starts (for the extension)
+                run_start = len(tokens)
+                last_is_punct = is_punct
+            tokens.append(match.group(0) if is_punct else "<PathString>")
+
+        # Handle extension (if existent): it replaces the last group
         ext = os.path.splitext(path)[1]
         ext = "" if ext == "" else ext[1:]  # remove . at beginning
-
-        l = [x for x in l if x != ""]
-
-        l = ["<PathString>" if not re.match(reg, x) else x for x in l]
-
         if ext != "":
-            l[-1] = ext
+            del tokens[run_start:]
+            if re.match(r"^[^\w\s]+$", ext):
+                tokens.extend(string_utils.split_string_on_changing_char(ext))
+            else:
+                tokens.append(ext)
 
-        # Split up parts consisting of multiple non-word chars (e.g., '/../' becomes ['/', '..', '/'])
-        l = [string_utils.split_string_on_changing_char(x) if re.match(r"^[^\w\s]+$", x) else x for x in l]
-        l = list_flatten(l)
-        return " ".join(l)
+        return " ".join(tokens)
 
     @staticmethod
     def handle_query(query_string):
@@ -89,19 +270,12 @@ class HTTPTransformer(DataTransformer):
         # More input here 
         # https://www.sans.org/reading-room/whitepapers/logging/detecting-attacks-web-applications-log-files-2074
         # https://netman.aiops.org/~peidan/ANM2019/13.Security/ReadingLists/p80-Liang.pdf
+        # Categories: see `ValueCategories.MASK_CATEGORIES`
         s = s.strip()
 
-        regex_categories = {
-            'singleChar': r'^[A-Za-z]{1}$',
-            'onlyAlpha': r'^[A-Za-z]+$',
-            'onlyNum': r'^(\d+(\.\d+)?)+$',
-            'alphanum': r'^[A-Za-z0-9]+$',
-            'mixed': r'^[A-Za-z0-9_]+$'
-        }
-
-        for token, regex in regex_categories.items():
-            if re.match(regex, s):
-                return f"[{token}]"
+        token = mask_category(s)
+        if token is not None:
+            return f"[{token}]"
         
         return s
     
@@ -139,22 +313,31 @@ class HTTPTransformer(DataTransformer):
         return q_list
 
     def mask_single_query_param(query_param):
-        # Split on 1+ non-word chars
-        reg = r'([^\w\s]+)'
-        l = re.split(reg, query_param)
-        # Kick out empty elements
-        l = [x for x in l if x != ""]
+        return " ".join(HTTPTransformer.iter_masked_tokens(query_param))
 
-        # Split non-word groups on changing chars
-        l = [string_utils.split_string_on_changing_char(x) if re.match(r"^[^\w\s]+$", x) else x for x in l]
-        l = list_flatten(l)
+    @staticmethod
+    def iter_masked_tokens(query_param):
+        """Splits a query parameter into tokens in a single pass and masks them: non-word chars
+        are split on every character change (e.g., `'..//'` becomes `'..'`, `'//'`), strings in
+        between are split on spaces and replaced by their mask string (see `get_mask_string`).
 
-        l = [x.split(" ") if " " in x else x for x in l]
-        l = list_flatten(l)
+        Args:
+            query_param (str): query parameter (value)
 
-        # Replace with mask strings
-        l = [HTTPTransformer.get_mask_string(x) for x in l]
-        return " ".join(l)
+        Yields:
+            str: masked token
+        """
+        for match in _TOKEN_REGEX.finditer(query_param):
+            if match.group(1) is not None:
+                # non-word chars never match a mask category
+                yield match.group(0)
+            else:
+                text = match.group(0)
+                if " " in text:
+                    for part in text.split(" "):
+                        yield HTTPTransformer.get_mask_string(part)
+                else:
+                    yield HTTPTransformer.get_mask_string(text)
 
 
     @staticmethod
@@ -192,7 +375,7 @@ class HTTPTransformer(DataTransformer):
 
         
     @staticmethod
-    def split_uri_into_components(uri, CSIC=False):
+    def split_uri_into_components(uri, CSIC=False, unquote_uri=True):
         """Some preprocessing steps for a URI string:
         1. Transforming to lower-case
         2. Unquoting the HTTP encoding
@@ -200,16 +383,19 @@ class HTTPTransformer(DataTransformer):
 
         Args:
             uri (str): URI String
+            CSIC (bool, optional): unquote with ISO-8859-1 encoding (CSIC dataset). Defaults to False.
+            unquote_uri (bool, optional): unquote the URI (skip it for decoded URIs). Defaults to True.
 
         Returns:
             dict: URI Object
         """
         uri = uri.lower()
-        if CSIC:
-            # parse (it seems ISO-8859-1 encoding is used in the CSIC dataset - for the spanish characters such as ó or '%F3' as HTTP encoded)
-            uri = unquote(uri, encoding="ISO-8859-1")
-        else:
-            uri = unquote(uri)
+        if unquote_uri:
+            if CSIC:
+                # parse (it seems ISO-8859-1 encoding is used in the CSIC dataset - for the spanish characters such as ó or '%F3' as HTTP encoded)
+                uri = unquote(uri, encoding="ISO-8859-1")
+            else:
+                uri = unquote(uri)
 
         # Split into URL components (Result keys: scheme, netloc, path, query, fragment)
         # SplitResult(scheme='http', netloc='localhost:8080', path='/tienda1/publico/vaciar.jsp', query='B2=Vaciar+carrito%27%3B+DROP+TABLE+[...]', fragment='')
@@ -224,31 +410,38 @@ class HTTPTransformer(DataTransformer):
         }
 
     @staticmethod
-    def nested_uri_decode(uri):
-        """Repeatedly encodes a given uri until it doesn't change anymore (due to possible applied nested encoding).
+    def nested_uri_decode(uri, max_depth=None, return_depth=False):
+        """Repeatedly decodes a given uri until it doesn't change anymore (due to possible applied nested encoding).
+        URIs without `%` are returned right away.
 
         Args:
             uri (string): uri string
+            max_depth (int, optional): maximum number of decoded nesting levels. Defaults to None (unbounded).
+            return_depth (bool, optional): also return the number of decoded nesting levels. Defaults to False.
 
         Returns:
-            uri: decoded uri string
+            uri: decoded uri string (and the nesting depth if `return_depth` is set)
         """
-        while True:
-            new_uri = unquote(uri)
-            if new_uri == uri:
-                break
-            uri = new_uri
-        return new_uri
+        uri, depth = string_utils.nested_unquote(uri, max_depth=max_depth)
+        return (uri, depth) if return_depth else uri
 
     @staticmethod
     def handle_body(header_dict):
         out = []
+        caches = HTTPTransformer.caches
         for key, val in header_dict.items():
-            transformed = HTTPTransformer.mask_single_query_param(val)
+            if caches is not None:
+                transformed = caches['body_value'].get(val, HTTPTransformer.mask_single_query_param)
+            else:
+                transformed = HTTPTransformer.mask_single_query_param(val)
             out.append("<HeaderKey> = "+transformed)
         
         return " ? ".join(out)
 
+    @staticmethod
+    def _handle_body_or_empty(body):
+        return "" if body == "" else HTTPTransformer.handle_body(body)
+
     @staticmethod
     def cleanse_tokenized_list(obj):
         """Cleanse the URI object's values w.r.t. non-alphanumeric characters.
@@ -299,50 +492,20 @@ class HTTPTransformer(DataTransformer):
 
     @classmethod
     def request_to_text_wrapper(cls, request):
-        text = []
-        # 1. Handle REQUEST HEADER
-        text.extend(HTTPTransformer.header_to_string_list(
-            request['header'], 'request'))
-        # 2. Handle RESPONSE HEADER
-        text.extend(HTTPTransformer.header_to_string_list(
-            request['honeypot']['response-header'], 'response'))
-        # 3. Handle REQUEST TIMESTAMP
-        text.append(datetime.fromtimestamp(request['timestamp']).fromtimestamp(
-            request['timestamp']).strftime("request_day_%a request_hour_%H request_minute_%M"))
-        # 4. Handle REQUEST METHOD + PROTOCOL
-        text.append('request_method_' + request['request']['method'] +
-                    ' request_protocol' + request['request']['protocol'])
-        # 5. Handle RESPONSE INFO (hash, size, status-code)
-        text.append(request['honeypot']['response-hash'] + " response_size_" + str(request['honeypot']['response-size'])
-                    + " response_status_" + str(request['honeypot']['response-status-code']))
-
-        # 6. Handle URL
-        #  -> Split into netloc & query parts (split on "?")
-        if '?' in request['request']['uri']:
-            filepart = request['request']['uri'].split('?')[0]
-            text.append(HTTPTransformer.url_params_to_string(
-                request['request']['uri'].split('?')[1]))
-        else:
-            filepart = request['request']['uri']
-
-        if filepart in ['/', '']:
-            text.append('path_')
-        for path in filepart.split('/'):
-            if path != "":
-                text.append('path_' + path)
+        """Converts a JSON request into the text used for the LDA corpus (including the request
+        time), see `RequestTextExtractor`. Parameter values are decoded up to `max_uri_decode_depth`.
 
-        # Handle BODY
-        if request['request']['method'] == "POST":
-            text.append(HTTPTransformer.body_to_string(
-                request['request']['body']))
-
-        # 7. Handle IP
-        ip_object = ip_address(request['sender']['ip'])
-        text.append(("private_ip " if ip_object.is_private else "")
-                    + ("global_ip " if ip_object.is_global else "")
-                    + ("reserved_ip" if ip_object.is_reserved else ""))
+        Args:
+            request (dict): JSON request
 
-        return ' '.join(text).lower()
+        Returns:
+            str: text of the request
+        """
+        extractor = cls.text_extractor
+        if extractor is None or extractor.max_uri_decode_depth != cls.max_uri_decode_depth:
+            extractor = cls.text_extractor = RequestTextExtractor(
+                use_times=True, max_uri_decode_depth=cls.max_uri_decode_depth)
+        return extractor(request)
 
     @staticmethod
     def header_to_string_list(header, type_prefix=""):
@@ -359,56 +522,73 @@ class HTTPTransformer(DataTransformer):
                 list: A list of words generated from the header, each prefixed with `type_prefix` + `_header_`
         """
         t = []
+        caches = HTTPTransformer.caches
 
         for key, value in header.items():
-            key_low = key.lower()
-            if key_low == 'cookie':
-                t.append(HTTPTransformer.url_params_to_string(
-                    value, prefix=type_prefix + '_cookie', delimiter=';'))
+            if caches is not None:
+                t.extend(caches['header_words'].get((type_prefix, key, value), HTTPTransformer._header_field_to_words))
             else:
-                t.append(type_prefix + '_header_' + key_low)
-
-                if key_low in ['date', 'expires', 'last-modified', 'if-modified-since', 'if-unmodified-since']:
-                    t.append(re.sub(r':\d\d:\d\d', '', value).replace(' ', ''))
-                elif key_low in ['x-powered-by', 'server', 'user-agent']:
-                    t.append(re.sub(r'(\d+(.|_))*\d+',
-                                    'version', value).replace(' ', ''))
-                elif key_low in ['accept', 'accept-language']:
-                    t.append(re.sub(r';?q=[\d.]+', '', value).replace(' ', ''))
-                else:
-                    t.append(re.sub(r'[^a-zA-Z0-9]', '', value))
+                t.extend(HTTPTransformer._header_field_to_words((type_prefix, key, value)))
         return t
 
+    @staticmethod
+    def _header_field_to_words(field):
+        type_prefix, key, value = field
+        key_low = key.lower()
+        if key_low == 'cookie':
+            return (HTTPTransformer.url_params_to_string(
+                value, prefix=type_prefix + '_cookie', delimiter=';'),)
+
+        if key_low in ['date', 'expires', 'last-modified', 'if-modified-since', 'if-unmodified-since']:
+            word = re.sub(r':\d\d:\d\d', '', value).replace(' ', '')
+        elif key_low in ['x-powered-by', 'server', 'user-agent']:
+            word = re.sub(r'(\d+(.|_))*\d+',
+                          'version', value).replace(' ', '')
+        elif key_low in ['accept', 'accept-language']:
+            word = re.sub(r';?q=[\d.]+', '', value).replace(' ', '')
+        else:
+            word = re.sub(r'[^a-zA-Z0-9]', '', value)
+        return (type_prefix + '_header_' + key_low, word)
+
     @staticmethod
     def transform_header(header):
         h = {}
-        for key, value in header.items():
-            key_low = key.lower()
-            if key_low == 'cookie':
-                # TODO: Handle cookie according to LDA Preprocess?
-                # HTTPTransformer.url_params_to_string(
-                #    value, prefix=type_prefix + '_cookie', delimiter=';')
-                h['cookie'] = HTTPTransformer.tokenize(value)
+        caches = HTTPTransformer.caches
+        for field in header.items():
+            if caches is not None:
+                key_low, value = caches['header'].get(field, HTTPTransformer._transform_header_field)
             else:
-                if key_low in ['date', 'expires', 'last-modified', 'if-modified-since', 'if-unmodified-since']:
-                    h[key_low] = re.sub(r':\d\d:\d\d', '',
-                                        value).replace(' ', '')
-                elif key_low in ['x-powered-by', 'server', 'user-agent']:
-                    h[key_low] = re.sub(r'(\d+(.|_))*\d+',
-                                        'version', value).replace(' ', '')
-                elif key_low in ['accept', 'accept-language']:
-                    h[key_low] = re.sub(r';?q=[\d.]+', '',
-                                        value).replace(' ', '')
-                else:
-                    h[key_low] = re.sub(r'[^a-zA-Z0-9]', '', value)
+                key_low, value = HTTPTransformer._transform_header_field(field)
+            # copy cached token lists (cookies), so callers can modify them
+            h[key_low] = list(value) if isinstance(value, list) else value
         return h
 
+    @staticmethod
+    def _transform_header_field(field):
+        key, value = field
+        key_low = key.lower()
+        if key_low == 'cookie':
+            # TODO: Handle cookie according to LDA Preprocess?
+            # HTTPTransformer.url_params_to_string(
+            #    value, prefix=type_prefix + '_cookie', delimiter=';')
+            return 'cookie', HTTPTransformer.tokenize(value)
+        if key_low in ['date', 'expires', 'last-modified', 'if-modified-since', 'if-unmodified-since']:
+            return key_low, re.sub(r':\d\d:\d\d', '',
+                                   value).replace(' ', '')
+        elif key_low in ['x-powered-by', 'server', 'user-agent']:
+            return key_low, re.sub(r'(\d+(.|_))*\d+',
+                                   'version', value).replace(' ', '')
+        elif key_low in ['accept', 'accept-language']:
+            return key_low, re.sub(r';?q=[\d.]+', '',
+                                   value).replace(' ', '')
+        return key_low, re.sub(r'[^a-zA-Z0-9]', '', value)
+
     @classmethod
     def body_to_string(cls, body):
         """Converts the body of a HTTP post request into a string of words. The
         words represent the relevant classes of characters which appear in the value,
         e.g. value_alphanum for alphanumerical characters (for the complete list,
-        see the dict called regToCategory above). 
+        see `VALUE_CATEGORIES` in `src.transformation.ValueCategories`). 
 
         Example: `key=123` becomes `post_key value_alphanum value_onlyText value_short_string value_num value_onlyNum`.
 
@@ -423,10 +603,7 @@ class HTTPTransformer(DataTransformer):
             if t != "":
                 t += " "
 
-            t += "post_" + name
-            for category, regex in cls.regex_categories.items():
-                t += "" if re.search(regex,
-                                     value) == None else " value_" + category
+            t += "post_" + name + value_categories_to_text(value)
         return t
 
     @classmethod
@@ -452,10 +629,7 @@ class HTTPTransformer(DataTransformer):
             if len(parts) > 1:
                 name, value = parts[0], unquote(parts[1])
 
-                t += prefix + "_" + name
-                for category, regex in cls.regex_categories.items():
-                    t += "" if re.search(regex,
-                                         value) == None else " value_" + category
+                t += prefix + "_" + name + value_categories_to_text(value)
             else:
                 t += prefix + "_" + param
         return t
@@ -467,26 +641,31 @@ class HTTPTransformer(DataTransformer):
     @staticmethod
     def cleanse_request(request):
         """Removes information from a request that should not be there - e.g., the attack label.
+        The original request is not modified; only the parts that change are copied.
 
         Args:
-            request (dict): request object to be cleansed
+            request (dict or RequestRecord): request object to be cleansed
 
         Returns:
-            dict: cleansed request object
+            dict or RequestRecord: cleansed request object
         """
-        # Make copy to maintain original dict.
-        request = deepcopy(request)
-        # Cleanse Header
         rmv_header_keys = ['X-ZAP-Scan-ID']
         for key in rmv_header_keys:
-            request['header'].pop(key)
-
+            if key not in request['header']:
+                raise KeyError(key)
+        if isinstance(request, RequestRecord):
+            return request.without_headers(rmv_header_keys)
+
+        # Copy the top level and the header only, everything else is shared with the original.
+        request = dict(request)
+        request['header'] = {key: value for key, value in request['header'].items() if key not in rmv_header_keys}
         return request
 
     @classmethod
     def replace_regex_categories(cls, input):
-        t = ""
-        for category, regex in cls.regex_categories.items():
-            t += "" if re.search(regex,
-                                 input) == None else " value_" + category
-        return t
+        return value_categories_to_text(input)
+
+
+def _items_key(value):
+    # dicts (bodies, headers) are identified by their items
+    return tuple(value.items()) if isinstance(value, Mapping) else value
@@ -0,0 +1,253 @@
+from datetime import datetime
+from ipaddress import ip_address
+import re
+
+from src.transformation.TransformCache import TransformCache
+from src.transformation.ValueCategories import value_categories_to_text
+from src.utils.string_utils import nested_unquote
+
+
+# Headers which are not turned into words at all (internal zap flag for later classification)
+SKIPPED_HEADERS = ['x-zap-scan-id']
+# Headers whose name is not turned into a word (only their value, if any)
+UNNAMED_HEADERS = ['accept', 'accept-encoding', 'accept-language', 'cache-control', 'connection', 'content-length', 'content-type', 'referer']
+# Headers whose value is not turned into a word
+VALUELESS_HEADERS = ['accept', 'accept-encoding', 'accept-language', 'connection', 'referer']
+# Dates: minutes and seconds are removed (only used with `use_times`)
+TIME_HEADERS = ['date', 'expires', 'last-modified', 'if-modified-since', 'if-unmodified-since']
+# Software: version numbers are replaced by the string 'version'
+VERSION_HEADERS = ['x-powered-by', 'server', 'user-agent']
+
+_TIME_REGEX = re.compile(r':\d\d:\d\d')
+_VERSION_REGEX = re.compile(r'(\d+(.|_))*\d+')
+_NON_ALPHANUMERIC_REGEX = re.compile(r'[^a-zA-Z0-9]')
+
+# Words of response hashes: raw (sha512) or compact (see `compact_response_hash`)
+RESPONSE_HASH_REGEX = re.compile(r'^(?:[a-f0-9]{128}|rhash_\S+)$')
+
+# Number of header names memoised before the memo is reset
+_MAX_HEADER_PLANS = 100000
+
+
+def _time_to_word(value):
+    return _TIME_REGEX.sub('', value).replace(' ', '')
+
+def _version_to_word(value):
+    return _VERSION_REGEX.sub('version', value).replace(' ', '')
+
+def _value_to_word(value):
+    return _NON_ALPHANUMERIC_REGEX.sub('', value)
+
+def compact_response_hash(response_hash):
+    """Converts a response hash into a compact id (`rhash_` and the first 16 hex digits). The
+    id only depends on the hash, so it is the same in all corpora (and runs).
+
+    Args:
+        response_hash (str): response hash (sha512, 128 hex digits)
+
+    Returns:
+        str: compact id
+    """
+    return 'rhash_' + response_hash[:16]
+
+def _ip_to_words(ip):
+    ip_object = ip_address(ip)
+    return (("private_ip " if ip_object.is_private else "")
+            + ("global_ip " if ip_object.is_global else "")
+            + ("reserved_ip" if ip_object.is_reserved else ""))
+
+
+class RequestTextExtractor():
+    """Converts JSON requests into the text documents of the LDA corpus. The settings are
+    compiled once: header names are dispatched through a table (filled lazily per raw header
+    name), the regexes are precompiled and the timestamp step is only part of the plan
+    with `use_times`. An extractor is called like a function, e.g. `extractor(request)`.
+
+    The words of sender IPs, response headers (keyed by all their fields) and response hashes
+    repeat over thousands of requests, they are memoised per extractor (see `enrichment_stats`).
+    """
+
+    ENRICHMENTS = ['ip', 'response_header', 'response_hash']
+
+    def __init__(self, use_times=True, max_uri_decode_depth=None, compact_response_hashes=False, cache_size=100000):
+        """Constructor.
+
+        Args:
+            use_times (bool, optional): Adds the request time and the time headers. Defaults to True.
+            max_uri_decode_depth (int, optional): Maximum number of nested URL encodings decoded in
+                parameter values. Defaults to None (unbounded).
+            compact_response_hashes (bool, optional): Replaces the response hashes by compact ids
+                (see `compact_response_hash`). Defaults to False.
+            cache_size (int, optional): Maximum number of memoised words per enrichment. Defaults to 100000.
+        """
+        self.use_times = use_times
+        self.max_uri_decode_depth = max_uri_decode_depth
+        self.compact_response_hashes = compact_response_hashes
+        # (type prefix, header name) -> (name word or None, value function or None)
+        self.header_plans = {}
+        self.caches = {name: TransformCache(cache_size) for name in self.ENRICHMENTS}
+        self.steps = [self.headers_to_text]
+        if use_times:
+            self.steps.append(self.timestamp_to_text)
+        self.steps.extend([self.request_line_to_text, self.response_to_text, self.uri_to_text,
+                           self.body_to_text, self.ip_to_text])
+
+    @classmethod
+    def from_settings(cls, settings):
+        """Compiles the `corpus` settings (`use_times`, `max_uri_decode_depth`, `compact_response_hashes`)
+        into an extractor.
+
+        Args:
+            settings (dict): The settings object for all kinds of parameters.
+
+        Returns:
+            RequestTextExtractor: extractor
+        """
+        return cls(use_times=settings['corpus']['use_times'],
+                   max_uri_decode_depth=settings['corpus'].get('max_uri_decode_depth'),
+                   compact_response_hashes=settings['corpus'].get('compact_response_hashes', False))
+
+    def __call__(self, request):
+        """Converts a JSON request into text.
+
+        Args:
+            request (dict): The JSON request to transform into text.
+
+        Returns:
+            str: The transformed request.
+        """
+        text = []
+        for step in self.steps:
+            step(request, text)
+        return ' '.join(text).lower()
+
+    def enrichment_stats(self):
+        """Counters (hits, misses, evictions, ...) per memoised enrichment.
+
+        Returns:
+            dict: stats per enrichment
+        """
+        return {name: cache.stats() for name, cache in self.caches.items()}
+
+    def header_plan(self, type_prefix, key):
+        """Compiles the handling of a single header name.
+
+        Args:
+            type_prefix (str): prefix for the header type (`request` or `response`)
+            key (str): header name
+
+        Returns:
+            tuple: (word for the name or None, function converting the value into a word or None)
+        """
+        key_low = key.lower()
+        if key_low == 'cookie':
+            prefix = type_prefix + '_cookie'
+            return None, lambda value: self.params_to_text(value, prefix=prefix, delimiter=';')
+        if key_low in SKIPPED_HEADERS:
+            return None, None
+
+        name = None if key_low in UNNAMED_HEADERS else type_prefix + '_header_' + key_low
+        if key_low in TIME_HEADERS:
+            return name, _time_to_word if self.use_times else None
+        if key_low in VERSION_HEADERS:
+            return name, _version_to_word
+        if key_low in VALUELESS_HEADERS:
+            return name, None
+        return name, _value_to_word
+
+    def header_to_words(self, fields, type_prefix, text):
+        """Converts a HTTP header into words. Several value parameters are transformed:
+        - Version numbers are replaced by the string 'version'
+        - For dates, minutes and seconds are removed
+        - And others (see `header_plan`).
+
+        Args:
+            fields (iterable of tuple): HTTP header fields (key-value pairs, e.g. `header.items()`)
+            type_prefix (str): prefix for the header type (`request` or `response`)
+            text (list): words of the request, the header words are appended
+        """
+        plans = self.header_plans
+        for key, value in fields:
+            plan = plans.get((type_prefix, key))
+            if plan is None:
+                if len(plans) >= _MAX_HEADER_PLANS:
+                    plans.clear()
+                plan = plans[(type_prefix, key)] = self.header_plan(type_prefix, key)
+            name, to_word = plan
+            if name is not None:
+                text.append(name)
+            if to_word is not None:
+                text.append(to_word(value))
+
+    def params_to_text(self, params, prefix='get', delimiter='&'):
+        """Converts url parameters into a string of words. The words represent the
+        relevant classes of characters which appear in the (nested url decoded) values
+        of the key-value pairs, see `value_categories_to_text`.
+
+        Args:
+            params (str): The url parameters to transform.
+            prefix (str, optional): Prefix specifying the request type. Defaults to 'get'.
+            delimiter (str, optional): The delimiter at which the parameters are split. Defaults to '&'.
+
+        Returns:
+            str: transformed url parameters.
+        """
+        words = []
+        for param in params.split(delimiter):
+            parts = param.split('=')
+            if len(parts) > 1:
+                value = nested_unquote(parts[1], max_depth=self.max_uri_decode_depth)[0]
+                words.append(prefix + "_" + parts[0] + value_categories_to_text(value))
+            else:
+                words.append(prefix + "_" + param)
+        return ' '.join(words)
+
+    def response_header_to_words(self, fields):
+        words = []
+        self.header_to_words(fields, 'response', words)
+        return words
+
+    def headers_to_text(self, request, text):
+        self.header_to_words(request['header'].items(), 'request', text)
+        # honeypot responses mostly share the same headers
+        fields = tuple(request['honeypot']['response-header'].items())
+        try:
+            text.extend(self.caches['response_header'].get(fields, self.response_header_to_words))
+        except TypeError:
+            # unhashable values
+            text.extend(self.response_header_to_words(fields))
+
+    def timestamp_to_text(self, request, text):
+        text.append(datetime.fromtimestamp(request['timestamp']).strftime("request_day_%a request_hour_%H request_minute_%M"))
+
+    def request_line_to_text(self, request, text):
+        text.append('request_method_' + request['request']['method'] + ' request_protocol_' + request['request']['protocol'])
+
+    def response_to_text(self, request, text):
+        honeypot = request['honeypot']
+        response_hash = honeypot['response-hash']
+        if self.compact_response_hashes:
+            response_hash = self.caches['response_hash'].get(response_hash, compact_response_hash)
+        text.append(response_hash + " response_size_" + str(honeypot['response-size'])
+                    + " response_status_" + str(honeypot['response-status-code']))
+
+    def uri_to_text(self, request, text):
+        # url as two parts => path to file and get params
+        filepart, question_mark, params = request['request']['uri'].partition('?')
+        if question_mark:
+            text.append(self.params_to_text(params))
+
+        path_string = 'path_'
+        text.append(path_string)
+        for path in filepart.split('/'):
+            if path != "":
+                path_string += 'file_' if '.' in path else 'folder_'
+                text.append(path_string)
+
+    def body_to_text(self, request, text):
+        if request['request']['method'] == "POST":
+            text.append(' '.join("post_" + name + value_categories_to_text(value)
+                                 for name, value in request['request']['body'].items()))
+
+    def ip_to_text(self, request, text):
+        text.append(self.caches['ip'].get(request['sender']['ip'], _ip_to_words))
@@ -0,0 +1,72 @@
+from collections import OrderedDict
+
+
+class TransformCache():
+    """Bounded memo of a transformation, keyed by its raw input. When the cache is full, the
+    least recently used entry is evicted. Hits, misses and evictions are counted, so the share
+    of cache-served transformations can be measured.
+    """
+
+    def __init__(self, max_size=100000):
+        """Constructor.
+
+        Args:
+            max_size (int, optional): maximum number of cached results. Defaults to 100000.
+        """
+        self.max_size = max_size
+        self.data = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self.data)
+
+    def __contains__(self, key):
+        # membership only, neither counted nor refreshed
+        return key in self.data
+
+    def get(self, key, compute):
+        """Returns the cached result for `key` or computes (and caches) it.
+
+        Args:
+            key (hashable): raw input
+            compute (callable): transformation, called with `key` on a miss
+
+        Returns:
+            any: transformed input
+        """
+        try:
+            value = self.data[key]
+        except KeyError:
+            self.misses += 1
+            value = self.data[key] = compute(key)
+            if len(self.data) > self.max_size:
+                self.data.popitem(last=False)
+                self.evictions += 1
+            return value
+        self.hits += 1
+        self.data.move_to_end(key)
+        return value
+
+    def stats(self):
+        """Counters of the cache.
+
+        Returns:
+            dict: `size`, `max_size`, `hits`, `misses`, `evictions` and `hit_rate`
+        """
+        lookups = self.hits + self.misses
+        return {
+            'size': len(self.data),
+            'max_size': self.max_size,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': self.hits / lookups if lookups > 0 else 0.0
+        }
+
+    def clear(self):
+        """Removes all entries and resets the counters.
+        """
+        self.data.clear()
+        self.hits = self.misses = self.evictions = 0
@@ -0,0 +1,168 @@
+import re
+import string
+
+# Character class categories of values (body fields, query parameters). A value belongs to
+# every category whose regular expression is found in it (`re.search`).
+VALUE_CATEGORIES = {
+    'alphanum': r'[A-Za-z0-9]',
+    'onlyText': r'^[ \,\:\.\!\?\;A-Za-z0-9]+$',
+    'alpha': r'[A-Za-z]',
+    'alphaUpper': r'[A-Z]',
+    'alphaLower': r'[a-z]',
+    'url': r'[/?&]',
+    'email': r'\w+@\w+\.\w',
+    'tag': r'[<>/]',
+    'function': r'\(.*\) *;?',
+    'num': r'\d*[.,]?\d+',
+    'onlyNum': r'^\d*[.,]?\d+$',
+    'short_string': r'^.{1,100}$',
+    'empty': r'^$',
+    'long_string': r'^.{101}.*$',
+    'reversepath': r'\.\.(\/|\\)'
+}
+
+# Mask categories of single tokens. A token is masked by the first category whose regular
+# expression matches it (`re.match`).
+MASK_CATEGORIES = {
+    'singleChar': r'^[A-Za-z]{1}$',
+    'onlyAlpha': r'^[A-Za-z]+$',
+    'onlyNum': r'^(\d+(\.\d+)?)+$',
+    'alphanum': r'^[A-Za-z0-9]+$',
+    'mixed': r'^[A-Za-z0-9_]+$'
+}
+
+_ASCII_ALNUM = frozenset(string.ascii_letters + string.digits)
+_ASCII_LETTERS = frozenset(string.ascii_letters)
+_ASCII_UPPER = frozenset(string.ascii_uppercase)
+_ASCII_LOWER = frozenset(string.ascii_lowercase)
+_ASCII_DIGITS = frozenset(string.digits)
+_URL_CHARS = frozenset('/?&')
+_TAG_CHARS = frozenset('<>/')
+_ONLY_TEXT_CHARS = frozenset(' ,:.!?;' + string.ascii_letters + string.digits)
+_NUM_SEPARATORS = frozenset('.,')
+_EMAIL_REGEX = re.compile(VALUE_CATEGORIES['email'])
+
+
+def _has_function(value):
+    # `\(.*\)`: a '(' followed by a ')' on the same line
+    if '\n' not in value:
+        return value.rfind(')') > value.find('(')
+    for line in value.split('\n'):
+        opening = line.find('(')
+        if opening != -1 and line.rfind(')') > opening:
+            return True
+    return False
+
+
+def value_categories(value):
+    """Determines all categories of `VALUE_CATEGORIES` a value belongs to. Instead of searching
+    each regular expression, the characters of the value are collected in a single scan and
+    the categories are derived from this set (the result is identical).
+
+    Args:
+        value (str): value (e.g., of a body field or query parameter)
+
+    Returns:
+        list of str: categories in the order of `VALUE_CATEGORIES`
+    """
+    chars = set(value)
+    # anchored expressions (`^...$`) also match before a single trailing newline
+    if value.endswith('\n'):
+        body = value[:-1]
+        body_chars = set(body)
+    else:
+        body = value
+        body_chars = chars
+    single_line = '\n' not in body_chars
+
+    categories = []
+    if not chars.isdisjoint(_ASCII_ALNUM):
+        categories.append('alphanum')
+    if body and body_chars <= _ONLY_TEXT_CHARS:
+        categories.append('onlyText')
+    if not chars.isdisjoint(_ASCII_LETTERS):
+        categories.append('alpha')
+    if not chars.isdisjoint(_ASCII_UPPER):
+        categories.append('alphaUpper')
+    if not chars.isdisjoint(_ASCII_LOWER):
+        categories.append('alphaLower')
+    if not chars.isdisjoint(_URL_CHARS):
+        categories.append('url')
+    if '@' in chars and _EMAIL_REGEX.search(value) is not None:
+        categories.append('email')
+    if not chars.isdisjoint(_TAG_CHARS):
+        categories.append('tag')
+    if '(' in chars and ')' in chars and _has_function(value):
+        categories.append('function')
+
+    if value.isascii():
+        has_digit = not chars.isdisjoint(_ASCII_DIGITS)
+    else:
+        has_digit = any(c.isdecimal() for c in chars)
+    if has_digit:
+        categories.append('num')
+        # `\d*[.,]?\d+` over the whole value
+        digits = body_chars - _NUM_SEPARATORS
+        if (digits and ''.join(digits).isdecimal() and body[-1].isdecimal()
+                and body.count('.') + body.count(',') <= 1):
+            categories.append('onlyNum')
+
+    if single_line and 1 <= len(body) <= 100:
+        categories.append('short_string')
+    if body == "":
+        categories.append('empty')
+    if single_line and len(body) >= 101:
+        categories.append('long_string')
+    if '..' in value and ('../' in value or '..\\' in value):
+        categories.append('reversepath')
+    return categories
+
+
+def value_categories_to_text(value, prefix=" value_"):
+    """Converts the categories of a value into words, e.g. ` value_alphanum value_num`.
+
+    Args:
+        value (str): value to categorise
+        prefix (str, optional): prefix of each word. Defaults to " value_".
+
+    Returns:
+        str: concatenated words (empty if the value has no category)
+    """
+    return "".join(prefix + category for category in value_categories(value))
+
+
+def mask_category(token):
+    """Determines the first category of `MASK_CATEGORIES` matching a (stripped) token, using
+    string predicates instead of regular expressions (the result is identical).
+
+    Args:
+        token (str): token without surrounding whitespace
+
+    Returns:
+        str: mask category or `None` if no category matches
+    """
+    if token == "" or token[-1] == '\n':
+        # `$` matches before a trailing newline, leave such tokens to the regular expressions
+        for category, regex in MASK_CATEGORIES.items():
+            if re.match(regex, token):
+                return category
+        return None
+
+    if token.isascii():
+        if token.isalpha():
+            return 'singleChar' if len(token) == 1 else 'onlyAlpha'
+        if token.isdecimal():
+            return 'onlyNum'
+        if token.isalnum():
+            return 'alphanum'
+        stripped = token.replace('_', '')
+        if stripped == "" or stripped.isalnum():
+            return 'mixed'
+    if '.' in token or not token.isascii():
+        # `(\d+(\.\d+)?)+`: numbers separated by single dots, each inner part has at
+        # least two digits (one closing the previous fraction, one starting the next number)
+        parts = token.split('.')
+        if (parts[0].isdecimal() and parts[-1].isdecimal()
+                and all(len(part) >= 2 and part.isdecimal() for part in parts[1:-1])):
+            return 'onlyNum'
+    return None
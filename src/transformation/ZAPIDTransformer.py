@@ -4,11 +4,39 @@ import pandas as pd
 class ZAPIDTransformer():
     """A helper class to lookup information based on a `X-ZAP-SCAN-ID`.
     Information taken from table at https://www.zaproxy.org/docs/alerts/.
+
+    The table is read lazily on the first lookup and shared by all instances of a process
+    (per file), so creating a transformer is cheap. Lookups are plain dict accesses.
     """
+
+    # Lookup tables per ZAP_ids.csv file (shared within the process)
+    _tables = {}
+
     def __init__(self, proj_root):
         self.proj_root = proj_root
-        file_path = path.join(proj_root, "references", "ZAP_ids.csv")
-        self.df = pd.read_csv(file_path, sep=";", index_col="Id")
+        self.file_path = path.join(proj_root, "references", "ZAP_ids.csv")
+
+    def _table(self):
+        key = path.abspath(self.file_path)
+        table = ZAPIDTransformer._tables.get(key)
+        if table is None:
+            df = pd.read_csv(self.file_path, sep=";", index_col="Id")
+            table = ZAPIDTransformer._tables[key] = {
+                'df': df,
+                'rules': df['Alert'].to_dict(),
+                'records': df.to_dict('index')
+            }
+        return table
+
+    @property
+    def df(self):
+        return self._table()['df']
+
+    @property
+    def rules(self):
+        """Mapping of ZAP ids (str) to their rule (`Alert`) strings.
+        """
+        return self._table()['rules']
 
     def id_to_rule(self, id):
         """Looks up an ID and returns the corresponding Rule string.
@@ -21,13 +49,27 @@ class ZAPIDTransformer():
             str: Rule String
         """
         id = str(id)
-        df = self.df
-
         try:
-            return df.at[id, 'Alert']
+            return self.rules[id]
         except KeyError:
             return f"unknown id ({id})"
-    
+
+    def map_ids(self, ids):
+        """Vectorized version of `id_to_rule` for a Series of ZAP ids.
+
+        Args:
+            ids (pd.Series): ZAP ids (str/int)
+
+        Returns:
+            pd.Series: Rule strings (same index)
+        """
+        ids = ids.astype(str)
+        rules = self.rules
+        known = ids.isin(list(rules))
+        result = ids.map(rules).astype(object)
+        result[~known] = "unknown id (" + ids[~known] + ")"
+        return result
+
     def lookup_id(self, id):
         """Looks up a ZAP-ID and returns a dictionary with all information.
         In case the ID is not found, an dictionary of format `{'Alert': 'unknown id (123)', 'Id': '123'}` is returned.
@@ -39,10 +81,26 @@ class ZAPIDTransformer():
             dict: information on said Id
         """
         id = str(id)
-        df = self.df
         try:
-            d = dict(df.loc[id])
+            d = dict(self._table()['records'][id])
         except KeyError:
             d = {'Alert': f'unknown id ({id})'}
         d['Id'] = id
-        return d
\ No newline at end of file
+        return d
+
+
+_LOOKUPS = {}
+
+def get_zap_lookup(proj_root):
+    """Returns the process-wide `ZAPIDTransformer` of a project (created on first use).
+
+    Args:
+        proj_root (str): path to project root
+
+    Returns:
+        ZAPIDTransformer: shared lookup
+    """
+    lookup = _LOOKUPS.get(proj_root)
+    if lookup is None:
+        lookup = _LOOKUPS[proj_root] = ZAPIDTransformer(proj_root)
+    return lookup
@@ -0,0 +1,112 @@
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+
+import numpy as np
+import pandas as pd
+
+
+def _apply_chunk(func, chunk):
+    return [func(value) for value in chunk]
+
+
+def map_values(func, values, n_workers=1, chunk_size=10000, initializer=None, initargs=()):
+    """Applies a function to a list of values, optionally in chunks on worker processes.
+    The order of the results always follows the order of `values`.
+
+    Args:
+        func (callable): function to apply (must be picklable, e.g. defined on module or class level)
+        values (list): values
+        n_workers (int, optional): number of worker processes. Defaults to 1 (current process).
+        chunk_size (int, optional): number of values per chunk sent to a worker. Defaults to 10000.
+        initializer (callable, optional): called with `initargs` in each worker process before any
+            value is processed, e.g. to pass on settings (workers do not inherit them unless they
+            are forked). Defaults to None.
+        initargs (tuple, optional): arguments of `initializer`. Defaults to ().
+
+    Returns:
+        list: results
+    """
+    if n_workers <= 1 or len(values) <= chunk_size:
+        return _apply_chunk(func, values)
+    chunks = [values[i:i + chunk_size] for i in range(0, len(values), chunk_size)]
+    results = []
+    with ProcessPoolExecutor(max_workers=n_workers, initializer=initializer, initargs=initargs) as executor:
+        for chunk_results in executor.map(_apply_chunk, repeat(func), chunks):
+            results.extend(chunk_results)
+    return results
+
+
+def map_distinct(func, values, key=None, n_workers=1, chunk_size=10000, initializer=None, initargs=()):
+    """Applies a function once per distinct value and spreads the results over all values.
+    Traffic is highly repetitive, so this saves most of the work of a deterministic
+    transformation.
+
+    Args:
+        func (callable): deterministic function to apply (must be picklable for `n_workers` > 1)
+        values (pd.Series or list): values
+        key (callable, optional): maps a value to a hashable key identifying equal values (e.g., for dicts).
+            Defaults to None (values are hashable strings, factorized by pandas).
+        n_workers (int, optional): number of worker processes. Defaults to 1.
+        chunk_size (int, optional): number of distinct values per chunk sent to a worker. Defaults to 10000.
+        initializer (callable, optional): see `map_values`. Defaults to None.
+        initargs (tuple, optional): arguments of `initializer`. Defaults to ().
+
+    Returns:
+        np.ndarray: results (dtype object) in the order of `values`; missing values (NaN/None) stay missing
+    """
+    codes, distinct = factorize_values(values, key=key)
+    results = map_values(func, distinct, n_workers=n_workers, chunk_size=chunk_size,
+                         initializer=initializer, initargs=initargs)
+    return take_results(results, codes)
+
+
+def factorize_values(values, key=None):
+    """Encodes values as codes into the list of their distinct values.
+
+    Args:
+        values (pd.Series or list): values
+        key (callable, optional): maps a value to a hashable key identifying equal values.
+            Defaults to None (values are hashable, factorized by pandas).
+
+    Returns:
+        tuple: (np.ndarray of codes, -1 for missing values; list of distinct values)
+    """
+    if key is None:
+        if not isinstance(values, pd.Series):
+            values = pd.Series(values, dtype=object)
+        codes, distinct = pd.factorize(values)
+        return codes, list(distinct)
+
+    index = {}
+    distinct = []
+    codes = np.empty(len(values), dtype=np.int64)
+    for i, value in enumerate(values):
+        try:
+            k = key(value)
+            code = index.get(k)
+            if code is None:
+                code = index[k] = len(distinct)
+                distinct.append(value)
+        except TypeError:
+            # unhashable key: no deduplication for this value
+            code = len(distinct)
+            distinct.append(value)
+        codes[i] = code
+    return codes, distinct
+
+
+def take_results(results, codes):
+    """Spreads the results per distinct value over all values (see `factorize_values`).
+
+    Args:
+        results (list): result per distinct value
+        codes (np.ndarray): codes of the values
+
+    Returns:
+        np.ndarray: results (dtype object) in the order of the values, None for missing values
+    """
+    array = np.empty(len(results) + 1, dtype=object)
+    for i, result in enumerate(results):
+        array[i] = result
+    # code -1 (missing value) takes the last element, which stays None
+    return array[codes]
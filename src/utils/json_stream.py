@@ -0,0 +1,157 @@
+import json
+
+_WHITESPACE = ' \t\n\r'
+_DELIMITERS = _WHITESPACE + ',]'
+
+
+def iter_json_array(f, chunk_size=1 << 16):
+    """Incrementally parses a file containing a single top-level JSON array and
+    yields its elements one at a time. Only the element currently being decoded
+    (plus one read chunk) is held in memory.
+
+    Args:
+        f (file): text file object opened for reading
+        chunk_size (int, optional): number of characters read per step. Defaults to 65536.
+
+    Raises:
+        ValueError: if the file does not contain a (single, complete) JSON array
+
+    Yields:
+        any: decoded array element
+    """
+    decoder = json.JSONDecoder()
+    buf = ""
+    pos = 0
+    eof = False
+    expect_value = True
+    after_comma = False
+    started = False
+
+    def fill(min_size):
+        nonlocal buf, pos, eof
+        chunk = f.read(max(chunk_size, min_size))
+        if chunk == "":
+            eof = True
+        buf = buf[pos:] + chunk
+        pos = 0
+
+    while True:
+        # skip whitespace and separators
+        while pos < len(buf) and buf[pos] in _WHITESPACE:
+            pos += 1
+        if pos >= len(buf):
+            if eof:
+                raise ValueError("Unexpected end of file while reading JSON array.")
+            fill(0)
+            continue
+
+        if not started:
+            if buf[pos] != '[':
+                raise ValueError(f"Expected a JSON array, found '{buf[pos]}'.")
+            started = True
+            pos += 1
+            continue
+
+        if buf[pos] == ']':
+            if after_comma:
+                raise ValueError("Unexpected ']' after ',' in JSON array.")
+            pos += 1
+            _check_trailing_whitespace(f, buf[pos:], chunk_size)
+            return
+        if buf[pos] == ',':
+            if expect_value:
+                raise ValueError("Unexpected ',' in JSON array.")
+            expect_value = True
+            after_comma = True
+            pos += 1
+            continue
+        if not expect_value:
+            raise ValueError(f"Expected ',' or ']' in JSON array, found '{buf[pos]}'.")
+
+        try:
+            obj, end = decoder.raw_decode(buf, pos)
+        except json.JSONDecodeError:
+            if eof:
+                raise
+            # element is not complete yet, grow the buffer geometrically
+            fill(len(buf) - pos)
+            continue
+
+        if not eof and (end == len(buf) or buf[end] not in _DELIMITERS):
+            # a scalar (e.g. a number) might be cut off at the chunk border
+            fill(len(buf) - pos)
+            continue
+
+        pos = end
+        expect_value = False
+        after_comma = False
+        yield obj
+
+
+def _check_trailing_whitespace(f, rest, chunk_size):
+    # only whitespace may follow the closing bracket of the array (like `json.loads`)
+    while True:
+        if rest.strip(_WHITESPACE) != "":
+            raise ValueError("Extra data after JSON array.")
+        rest = f.read(chunk_size)
+        if rest == "":
+            return
+
+
+def iter_json_lines(f):
+    """Parses a JSON Lines file (one JSON document per line) and yields the documents
+    one at a time. Empty lines are skipped.
+
+    Args:
+        f (file): text file object opened for reading
+
+    Yields:
+        any: decoded document
+    """
+    for line in f:
+        line = line.strip()
+        if line:
+            yield json.loads(line)
+
+
+def is_json_lines(f):
+    """Detects whether a file contains JSON Lines or a single JSON array by peeking at its
+    first non-whitespace character. The file position is reset afterwards.
+
+    Args:
+        f (file): seekable text file object opened for reading
+
+    Returns:
+        bool: True for JSON Lines, False for a JSON array
+    """
+    first = ""
+    while True:
+        chunk = f.read(1024)
+        if chunk == "":
+            break
+        stripped = chunk.lstrip(_WHITESPACE)
+        if stripped != "":
+            first = stripped[0]
+            break
+    f.seek(0)
+    return first != '['
+
+
+def iter_json_records(file_path, chunk_size=1 << 16):
+    """Yields the records (requests) of a capture file one at a time. Both a single
+    top-level JSON array and JSON Lines are supported; the format is detected
+    automatically.
+
+    Args:
+        file_path (str): path to the capture file
+        chunk_size (int, optional): number of characters read per step for JSON arrays.
+            Defaults to 65536.
+
+    Yields:
+        dict: record
+    """
+    with open(file_path, 'r') as f:
+        if is_json_lines(f):
+            yield from iter_json_lines(f)
+        else:
+            yield from iter_json_array(f, chunk_size=chunk_size)
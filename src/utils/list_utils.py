@@ -1,4 +1,4 @@
-from itertools import chain
+from itertools import chain, islice
 
 def list_intersperse(list, item):
     """Intersperses an item between every element of a list.
@@ -16,8 +16,41 @@ def list_intersperse(list, item):
     return result
 
 def list_flatten(l):
-    if l == []:
-        return l
-    if isinstance(l[0], list):
-        return list_flatten(l[0]) + list_flatten(l[1:])
-    return l[:1] + list_flatten(l[1:])
\ No newline at end of file
+    """Flattens arbitrarily nested lists (other elements are kept as they are). Works
+    iteratively, so deeply nested or long lists neither hit the recursion limit nor
+    are copied over and over.
+
+    Args:
+        l (list): nested list
+
+    Returns:
+        list: flat list
+    """
+    result = []
+    stack = [iter(l)]
+    while stack:
+        for x in stack[-1]:
+            if isinstance(x, list):
+                stack.append(iter(x))
+                break
+            result.append(x)
+        else:
+            stack.pop()
+    return result
+
+def iter_chunks(iterable, size):
+    """Splits an iterable into lists of (at most) `size` consecutive elements.
+
+    Args:
+        iterable (iterable): elements to be chunked
+        size (int): chunk size
+
+    Yields:
+        list: chunk
+    """
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
@@ -1,4 +1,5 @@
 from itertools import groupby
+from urllib.parse import unquote
  
 def split_string_on_changing_char(text):
     """Splits a string on every character change.
@@ -10,4 +11,26 @@ def split_string_on_changing_char(text):
         list: list of splitted strings
     """
     return [''.join(group) for key, group in groupby(text)]
- 
+
+
+def nested_unquote(text, max_depth=None):
+    """Decodes (possibly nested) URL encoding, i.e. unquotes until the text does not change
+    anymore. Text without `%` is returned right away. Each nesting level is one `unquote`
+    call (not a single pass), so results and depths are exactly those of repeated `unquote`,
+    including the UTF-8 replacement of invalid byte sequences per level.
+
+    Args:
+        text (str): text to be decoded
+        max_depth (int, optional): maximum number of decoded nesting levels. Defaults to None (unbounded).
+
+    Returns:
+        tuple: (decoded text, number of decoded nesting levels)
+    """
+    depth = 0
+    while '%' in text and (max_depth is None or depth < max_depth):
+        decoded = unquote(text)
+        if decoded == text:
+            break
+        text = decoded
+        depth += 1
+    return text, depth
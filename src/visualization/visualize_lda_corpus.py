@@ -1,11 +1,11 @@
-import json
 import numpy
 import random
-import re
 import concurrent.futures
 import math
 
 from src.utils.jaccard_utils import chunked_jaccard_wrapper 
+from src.data.make_datasets_lda import load_corpus
+from src.transformation.RequestTextExtractor import RESPONSE_HASH_REGEX
 
 word_id_map = {} # Maps each word to a unique id (index)
 word_id_max = 0 # Keeps track of the next free id
@@ -25,7 +25,8 @@ def get_word_id_array(d):
 
 	idlist = []
 	for word in words_from_doc(d):
-		if re.match(r'^[a-f0-9]{128}$', word) == None:
+		# response hashes (raw or compact) are unique per response, they are left out
+		if RESPONSE_HASH_REGEX.match(word) == None:
 			if word not in word_id_map:
 				word_id_map[word] = word_id_max
 				word_id_max += 1
@@ -144,8 +145,8 @@ def main(settings, numpy_rounds=10, numpy_chunksize=1000, numpy_steps=20, worker
 
 def main_sklearn_approach(settings):
 	# load the two corpora for which we want to compute the jaccard coefficient
-	corpus_a = json.load(open(settings['output']['dir'] + 'processed/' + settings['output']['name'] + '_trainset.json', 'r'))
-	corpus_b = json.load(open(settings['output']['dir'] + 'processed/' + settings['output']['name'] + '_testset.json', 'r'))
+	corpus_a = load_corpus(settings['output']['dir'] + 'processed/' + settings['output']['name'] + '_trainset.json')
+	corpus_b = load_corpus(settings['output']['dir'] + 'processed/' + settings['output']['name'] + '_testset.json')
 
 	doclist_a = [ list(words_from_doc(d)) for d in corpus_a ]
 	doclist_b = [ list(words_from_doc(d)) for d in corpus_b ]
@@ -162,8 +163,8 @@ def main_sklearn_approach(settings):
 def main_numpy_approach(settings, numpy_rounds, numpy_chunksize, numpy_steps, worker_count):
 	global word_id_map
 	# load the two corpora for which we want to compute the jaccard coefficient
-	corpus_a = json.load(open(settings['output']['dir'] + 'processed/' + settings['output']['name'] + '_trainset.json', 'r'))
-	corpus_b = json.load(open(settings['output']['dir'] + 'processed/' + settings['output']['name'] + '_testset.json', 'r'))
+	corpus_a = load_corpus(settings['output']['dir'] + 'processed/' + settings['output']['name'] + '_trainset.json')
+	corpus_b = load_corpus(settings['output']['dir'] + 'processed/' + settings['output']['name'] + '_testset.json')
 
 	# identify all words use in the first corpus
 	wordlist_a = []